@@ -1,22 +1,286 @@
+#!/usr/bin/env python3
+"""
+Benchmark the search algorithms in process, over every search order (and every cost method for the
+heuristic searches) on a corpus of levels.
+Each run records the search time, the nodes expanded and generated, the largest frontier, the peak memory
+allocated by the search and the length of the path found. The runs are written as JSON and/or CSV files,
+to compare the results of different releases.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tracemalloc
 from itertools import permutations
-from os import system
+from statistics import median
+from time import perf_counter, strftime
 
-args = ['python3', './bloxorz.py', '-v']
+from bloxorz import (COST_METHODS, HEURISTIC_SEARCHES, OPEN_LIST_TYPES, SEARCHES, Bloxorz, UnsupportedSearch,
+                     level_files, parser as bloxorz_parser, validate_list, validate_search_order)
+from level import Level
+from orientation import Orientation
+from pos import Pos
 
-# BFS, DFS
-for perm in permutations(['L', 'U', 'R', 'D']):
-    for algorithm in ['bfs', 'dfs']:
-        opts = ['-o', ''.join(perm), '-s', algorithm]
-        system(' '.join(args + opts))
+# searches with a choice of open list backend, run once per open list.
+OPEN_LIST_ALGORITHMS = ('ucs', 'a-star')
 
-        print("\n\nalgorithm: {}, order: {}".format(algorithm, ''.join(perm)))
-        input("press ENTER to continue - ")
+FIELDS = ['level', 'algorithm', 'order', 'cost_method', 'open_list', 'status', 'elapsed', 'expanded', 'generated',
+          'max_frontier', 'peak_memory', 'cost']
 
-# A*
-for perm in permutations(['L', 'U', 'R', 'D']):
-    for cost_heuristic in ['euclidean', 'manhattan']:
-        opts = ['-o', ''.join(perm), '-s', 'a-star', '-c', cost_heuristic]
-        system(' '.join(args + opts))
 
-        print("\n\nalgorithm: A*, order: {}, heuristic: {}".format(''.join(perm), cost_heuristic))
-        input("press ENTER to continue - ")
+class SearchTimeout(Exception):
+    """
+    Raised from the alarm signal handler when a search runs for longer than the time limit.
+    """
+
+
+def raise_timeout(signum, frame):
+    raise SearchTimeout()
+
+
+def run_search(blox: Bloxorz, start_pos: Pos, target_pos: Pos, repeat: int, timeout: float) -> dict:
+    """
+    Run the search selected in the arguments of a Bloxorz object.
+    The search time is the best of the repeated runs, the peak memory is measured on one more run,
+    as tracing the allocations slows the search down.
+    Searches that never end on some levels (e.g. deep DFS on large maps) are stopped at the time limit.
+    :param blox: Bloxorz object, with the search algorithm, order and cost method set in its arguments.
+    :param start_pos: Start position of the brick.
+    :param target_pos: Target position of the brick.
+    :param repeat: Number of timed runs.
+    :param timeout: Time limit of a single run in seconds, 0 for no limit.
+    :return: dictionary of the measured values, only the status if the time limit was reached, the search is not
+        supported on the level or raised an error.
+    """
+    signal.signal(signal.SIGALRM, raise_timeout)
+    try:
+        elapsed = None
+        for _ in range(repeat):
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+            result = blox.solve(start_pos, target_pos)
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            elapsed = result.elapsed if elapsed is None else min(elapsed, result.elapsed)
+
+        tracemalloc.start()
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        blox.solve(start_pos, target_pos)
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    except SearchTimeout:
+        return {"status": "timeout"}
+    except UnsupportedSearch:
+        # search, cost method or open list not supported on the level.
+        return {"status": "unsupported"}
+    except Exception as e:
+        # a failing search is recorded, the rest of the benchmark goes on.
+        print("{} failed: {}: {}".format(blox.args.search, type(e).__name__, e), file=sys.stderr)
+        return {"status": "error"}
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        tracemalloc.stop()
+
+    return {
+        "status": "solved" if result.path is not None else "unsolved",
+        "elapsed": elapsed,
+        "expanded": result.expanded,
+        "generated": result.generated,
+        "max_frontier": result.max_frontier,
+        "peak_memory": peak_memory,
+        "cost": result.cost
+    }
+
+
+def benchmark_level(path: str, args: argparse.Namespace) -> list:
+    """
+    Benchmark all the selected algorithms, search orders, cost methods and open lists on a level.
+    :param path: Level file path.
+    :param args: Benchmark arguments.
+    :return: List of run dictionaries.
+    """
+    level = Level.load(path)
+    start_pos = Pos(level.start[0], level.start[1], Orientation.STANDING)
+    target_pos = Pos(level.target[0], level.target[1], Orientation.STANDING)
+
+    runs = list()
+    for order in args.orders:
+        # the transition table depends on the search order, one Bloxorz object per order.
+        blox_args = ['--quiet', '--order', order, '--cache-dir', args.cache_dir, '--tt-size', str(args.tt_size)]
+        blox = Bloxorz(level, bloxorz_parser.parse_args(blox_args + (['--precompute'] if args.precompute else [])))
+
+        for algorithm in args.algorithms:
+            cost_methods = args.cost_methods if algorithm in HEURISTIC_SEARCHES else [None]
+            open_lists = args.open_lists if algorithm in OPEN_LIST_ALGORITHMS else [None]
+            for cost_method in cost_methods:
+                for open_list in open_lists:
+                    blox.args.search = algorithm
+                    blox.args.cost_method = cost_method or 'euclidean'
+                    blox.args.open_list = open_list or 'heap'
+                    run = {"level": path, "algorithm": algorithm, "order": order, "cost_method": cost_method,
+                           "open_list": open_list}
+                    run.update(run_search(blox, start_pos, target_pos, args.repeat, args.timeout))
+                    runs.append(run)
+
+                    if args.quiet:
+                        continue
+                    if run["status"] in ("timeout", "unsupported", "error"):
+                        print("{:20s} {:>10s} {:>5s} {:>10s} {:>6s} {:>10s}".format(
+                            os.path.basename(path), algorithm, order, cost_method or '-', open_list or '-',
+                            run["status"]))
+                    else:
+                        print("{:20s} {:>10s} {:>5s} {:>10s} {:>6s} {:>10.3f} {:>10d} {:>10d} {:>10d} {:>12d} "
+                              "{:>6}".format(
+                                  os.path.basename(path), algorithm, order, cost_method or '-', open_list or '-',
+                                  run["elapsed"] * 1000, run["expanded"], run["generated"], run["max_frontier"],
+                                  run["peak_memory"], "-" if run["cost"] is None else run["cost"]))
+    return runs
+
+
+# run in a fresh interpreter by benchmark_startup, prints the import and first solve times of the library API.
+STARTUP_CODE = """
+import json, time
+start_time = time.perf_counter()
+import bloxorz
+import_time = time.perf_counter() - start_time
+bloxorz.solve(bloxorz.Level.load({path!r}), algorithm={algorithm!r})
+print(json.dumps({{"import": import_time, "first_solve": time.perf_counter() - start_time - import_time}}))
+"""
+
+
+def benchmark_startup(path: str, algorithm: str, repeat: int) -> dict:
+    """
+    Measure the startup cost of the library API: the time to import bloxorz and to solve a first level,
+    in a fresh interpreter each time, and the time to start an interpreter doing nothing as a baseline.
+    :param path: Level file path.
+    :param algorithm: Search method of the first solve.
+    :param repeat: Number of interpreters started, the median times are kept.
+    :return: dictionary of the median times in seconds.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    code = STARTUP_CODE.format(path=os.path.abspath(path), algorithm=algorithm)
+
+    interpreter, process, import_times, solve_times = list(), list(), list(), list()
+    for _ in range(repeat):
+        start_time = perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        interpreter.append(perf_counter() - start_time)
+
+        start_time = perf_counter()
+        output = subprocess.run([sys.executable, '-c', code], cwd=cwd, check=True, stdout=subprocess.PIPE).stdout
+        process.append(perf_counter() - start_time)
+        times = json.loads(output)
+        import_times.append(times["import"])
+        solve_times.append(times["first_solve"])
+
+    return {
+        "level": path,
+        "algorithm": algorithm,
+        "interpreter": median(interpreter),
+        "import": median(import_times),
+        "first_solve": median(solve_times),
+        "process": median(process)
+    }
+
+
+def write_json(path: str, runs: list):
+    """
+    Write the runs to a JSON file, along with the python version and the time of the benchmark.
+    :param path: JSON file path.
+    :param runs: List of run dictionaries.
+    """
+    with open(path, 'w') as file:
+        json.dump({
+            "python": platform.python_version(),
+            "time": strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "runs": runs
+        }, file, indent=2)
+
+
+def write_csv(path: str, runs: list):
+    """
+    Write the runs to a CSV file, one row per run.
+    :param path: CSV file path.
+    :param runs: List of run dictionaries.
+    """
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(runs)
+
+
+def validate_repeat(value: str) -> int:
+    """
+    Argument type for the number of timed runs, at least one run is needed to measure a search.
+    :param value: Argument value.
+    :return: Number of runs.
+    """
+    repeat = int(value)
+    if repeat < 1:
+        raise argparse.ArgumentTypeError("Bad repeat {}. Must be at least 1".format(value))
+    return repeat
+
+
+parser = argparse.ArgumentParser(description='Bloxorz search benchmark.')
+parser.add_argument('levels', nargs='*', default=['levels'],
+                    help='Level files or directories of level files. (default=levels)')
+parser.add_argument('-a', '--algorithms', type=validate_list(SEARCHES), default=SEARCHES,
+                    help='Comma separated search methods. (default=all)')
+parser.add_argument('-c', '--cost-methods', type=validate_list(COST_METHODS), default=COST_METHODS,
+                    help='Comma separated cost methods of the heuristic searches. (default=all)')
+parser.add_argument('--cache-dir', default=os.path.join(os.path.expanduser('~'), '.cache', 'bloxorz'),
+                    help='Directory of the exact heuristic cost tables. (default=~/.cache/bloxorz)')
+parser.add_argument('--csv', help='CSV output file.')
+parser.add_argument('--json', help='JSON output file.')
+parser.add_argument('-o', '--orders', type=lambda value: [validate_search_order(order) for order in value.split(',')],
+                    default=[''.join(perm) for perm in permutations('LRUD')],
+                    help='Comma separated search orders. (default=all permutations of LRUD)')
+parser.add_argument('--open-lists', type=validate_list(OPEN_LIST_TYPES), default=['heap'],
+                    help='Comma separated open lists of the UCS and A* searches. (default=heap)')
+parser.add_argument('-p', '--precompute', action='store_true',
+                    help='Precompute the state transition table of each level and order.')
+parser.add_argument('-q', '--quiet', action='store_true', help='Do not print a line per run.')
+parser.add_argument('-r', '--repeat', type=validate_repeat, default=1,
+                    help='Number of timed runs, the best time is kept. (default=1)')
+parser.add_argument('--startup', action='store_true',
+                    help='Benchmark the import time of bloxorz and the latency of a first solve on the first level '
+                         'with the first algorithm, instead of the searches.')
+parser.add_argument('--tt-size', type=int, default=bloxorz_parser.get_default('tt_size'),
+                    help='Maximum number of states in the transposition table of IDA*, 0 for no table. '
+                         '(default=65536)')
+parser.add_argument('-t', '--timeout', type=float, default=5.0,
+                    help='Time limit of a single run in seconds, 0 for no limit. (default=5)')
+
+
+if __name__ == '__main__':
+    bench_args = parser.parse_args()
+
+    if bench_args.startup:
+        startup = benchmark_startup(level_files(bench_args.levels)[0], bench_args.algorithms[0], bench_args.repeat)
+        print("{:20s} {:>10s} {:>12s} {:>10s} {:>12s} {:>12s}".format(
+            "level", "algorithm", "python (ms)", "import (ms)", "solve (ms)", "process (ms)"))
+        print("{:20s} {:>10s} {:>12.1f} {:>10.1f} {:>12.1f} {:>12.1f}".format(
+            os.path.basename(startup["level"]), startup["algorithm"], startup["interpreter"] * 1000,
+            startup["import"] * 1000, startup["first_solve"] * 1000, startup["process"] * 1000))
+        if bench_args.json:
+            write_json(bench_args.json, [startup])
+        sys.exit(0)
+
+    if not bench_args.quiet:
+        print("{:20s} {:>10s} {:>5s} {:>10s} {:>6s} {:>10s} {:>10s} {:>10s} {:>10s} {:>12s} {:>6s}".format(
+            "level", "algorithm", "order", "cost", "open", "time (ms)", "expanded", "generated", "frontier",
+            "memory (B)", "path"))
+
+    all_runs = list()
+    for level_file in level_files(bench_args.levels):
+        try:
+            all_runs += benchmark_level(level_file, bench_args)
+        except (OSError, ValueError) as e:
+            print("Skipped level file '{}': {}".format(level_file, e), file=sys.stderr)
+
+    if bench_args.json:
+        write_json(bench_args.json, all_runs)
+    if bench_args.csv:
+        write_csv(bench_args.csv, all_runs)
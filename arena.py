@@ -0,0 +1,72 @@
+from array import array
+from typing import List
+from direction import Direction
+
+
+class NodeArena:
+    """
+    Array backed storage for search tree nodes.
+    Each node is an index into flat columns holding the packed state id, parent index, g cost,
+    depth and the direction of the move from the parent. Nodes never reference each other,
+    so the tree costs a few bytes per node and is dropped as a whole with the arena.
+    """
+
+    NO_PARENT = -1
+
+    def __init__(self):
+        self.state = array('q')
+        self.parent = array('l')
+        self.g_cost = array('l')
+        self.depth = array('l')
+
+        # Direction enum value of the move from the parent, 0 for the root node.
+        self.direction = array('b')
+
+    def __len__(self) -> int:
+        return len(self.state)
+
+    def add(self, state: int, parent: int = NO_PARENT, g_cost: int = 0, direction: Direction = None) -> int:
+        """
+        Append a new node to the arena.
+        :param state: Packed state id of the node.
+        :param parent: Index of the parent node, NO_PARENT for the root node.
+        :param g_cost: Actual cost to reach the node.
+        :param direction: Direction of the move from the parent node, None for the root node.
+        :return: Index of the new node.
+        """
+        self.state.append(state)
+        self.parent.append(parent)
+        self.g_cost.append(g_cost)
+        self.depth.append(0 if parent == self.NO_PARENT else self.depth[parent] + 1)
+        self.direction.append(0 if direction is None else direction.value)
+        return len(self.state) - 1
+
+    def truncate(self, size: int):
+        """
+        Drop the nodes added after the first 'size' nodes.
+        :param size: Number of nodes to keep.
+        """
+        for column in (self.state, self.parent, self.g_cost, self.depth, self.direction):
+            del column[size:]
+
+    def get_direction(self, index: int) -> Direction:
+        """
+        Direction of the move leading from the parent to the given node.
+        :param index: Node index.
+        :return: Direction enumeration, None for the root node.
+        """
+        value = self.direction[index]
+        return Direction(value) if value else None
+
+    def path(self, index: int) -> List[Direction]:
+        """
+        Walk up from the given node to the root node and collect the moves on the way.
+        :param index: Leaf node index.
+        :return: List of directions leading from the root node to the leaf node.
+        """
+        moves = list()
+        while self.parent[index] != self.NO_PARENT:
+            moves.append(Direction(self.direction[index]))
+            index = self.parent[index]
+        moves.reverse()
+        return moves
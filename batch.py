@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Solve a batch of levels, for every algorithm, search order and (for the heuristic searches) cost method,
+across a pool of worker processes. Results are written to stdout as JSON lines, in the order they complete.
+
+    $ python3 ./bloxorz.py batch levels -j 4
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import permutations
+from typing import List, Tuple
+
+from bloxorz import (COST_METHODS, HEURISTIC_SEARCHES, SEARCHES, Bloxorz, UnsupportedSearch, level_files,
+                     parser as bloxorz_parser, validate_list, validate_search_order)
+from level import Level
+from orientation import Orientation
+from pos import Pos
+
+# per worker process: (level file, order) -> Bloxorz object, with its transition table and heuristic costs,
+# for the level of the last task only.
+solvers = dict()
+
+
+def get_solver(path: str, order: str, precompute: bool, cache_dir: str) -> Bloxorz:
+    """
+    Bloxorz object of a level and search order, built on the first job of the worker process for them.
+    Tasks are submitted level by level, the objects of the other levels are dropped when a worker moves on.
+    :param path: Level file path.
+    :param order: Order of search directions.
+    :param precompute: Precompute the state transition table.
+    :param cache_dir: Directory of the exact heuristic cost tables.
+    :return: Bloxorz object.
+    """
+    if (path, order) not in solvers:
+        for key in [key for key in solvers if key[0] != path]:
+            del solvers[key]
+        blox_args = ['--quiet', '--order', order, '--cache-dir', cache_dir]
+        blox_args += ['--precompute'] if precompute else []
+        solvers[path, order] = Bloxorz(Level.load(path), bloxorz_parser.parse_args(blox_args))
+    return solvers[path, order]
+
+
+def solve_jobs(path: str, order: str, configs: List[Tuple[str, str]], precompute: bool, cache_dir: str) -> list:
+    """
+    Solve a level with one search order for a list of (algorithm, cost method) configurations.
+    Runs in a worker process.
+    :param path: Level file path.
+    :param order: Order of search directions.
+    :param configs: List of (algorithm, cost method) tuples, cost method None for the searches without heuristic.
+    :param precompute: Precompute the state transition table.
+    :param cache_dir: Directory of the exact heuristic cost tables.
+    :return: List of result dictionaries.
+    """
+    try:
+        blox = get_solver(path, order, precompute, cache_dir)
+    except (OSError, ValueError) as e:
+        return [{"level": path, "order": order, "error": str(e)}]
+
+    start_pos = Pos(blox.level.start[0], blox.level.start[1], Orientation.STANDING)
+    target_pos = Pos(blox.level.target[0], blox.level.target[1], Orientation.STANDING)
+
+    results = list()
+    for algorithm, cost_method in configs:
+        blox.args.search = algorithm
+        blox.args.cost_method = cost_method or 'euclidean'
+        result = {"level": path, "algorithm": algorithm, "order": order, "cost_method": cost_method}
+        try:
+            result.update(blox.solve(start_pos, target_pos).to_dict())
+        except UnsupportedSearch as e:
+            # search or cost method not supported on the level.
+            result["error"] = str(e)
+        except Exception as e:
+            # a failing job is reported, the other jobs of the batch go on.
+            result["error"] = "{}: {}".format(type(e).__name__, e)
+        results.append(result)
+    return results
+
+
+def main(argv: List[str] = None):
+    """
+    Run the batch and print the results as JSON lines.
+    :param argv: Command line arguments, defaults to sys.argv.
+    """
+    args = parser.parse_args(argv)
+
+    configs = list()
+    for algorithm in args.algorithms:
+        for cost_method in (args.cost_methods if algorithm in HEURISTIC_SEARCHES else [None]):
+            configs.append((algorithm, cost_method))
+
+    # one task per (level, order), the jobs of a task share the Bloxorz object of the worker.
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {executor.submit(solve_jobs, path, order, configs, args.precompute, args.cache_dir): (path, order)
+                   for path in level_files(args.levels) for order in args.orders}
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                # the worker died or the results could not be sent back, e.g. out of memory.
+                path, order = futures[future]
+                results = [{"level": path, "order": order, "error": "{}: {}".format(type(e).__name__, e)}]
+            for result in results:
+                print(json.dumps(result), flush=True)
+
+
+parser = argparse.ArgumentParser(prog='bloxorz.py batch', description='Bloxorz batch solver.')
+parser.add_argument('levels', nargs='*', default=['levels'],
+                    help='Level files or directories of level files. (default=levels)')
+parser.add_argument('-a', '--algorithms', type=validate_list(SEARCHES), default=SEARCHES,
+                    help='Comma separated search methods. (default=all)')
+parser.add_argument('-c', '--cost-methods', type=validate_list(COST_METHODS), default=COST_METHODS,
+                    help='Comma separated cost methods of the heuristic searches. (default=all)')
+parser.add_argument('--cache-dir', default=os.path.join(os.path.expanduser('~'), '.cache', 'bloxorz'),
+                    help='Directory of the exact heuristic cost tables. (default=~/.cache/bloxorz)')
+parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                    help='Number of worker processes. (default=number of CPUs)')
+parser.add_argument('-o', '--orders', type=lambda value: [validate_search_order(order) for order in value.split(',')],
+                    default=[''.join(perm) for perm in permutations('LRUD')],
+                    help='Comma separated search orders. (default=all permutations of LRUD)')
+parser.add_argument('-p', '--precompute', action='store_true',
+                    help='Precompute the state transition table of each level and order.')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,132 @@
+from typing import List, Tuple
+from brick import Brick
+from direction import Direction
+from orientation import Orientation
+from pos import Pos
+
+
+class BitsetBFS:
+    """
+    Level synchronous BFS over bitsets of the (orientation, y, x) state grid.
+    Each orientation has one bitset (a python int) with one bit per tile, row by row.
+    A whole BFS layer is expanded at once: for every orientation and direction, the frontier bitset
+    is shifted by the move offset and masked by the tiles where the brick fits in the new orientation.
+    Rows are padded with two unused columns, so that moves of up to two tiles never wrap onto the next row.
+    """
+
+    PADDING = 2
+
+    def __init__(self, blox):
+        """
+        Build the per orientation masks of the world map and the move offsets.
+        :param blox: Bloxorz object providing the world map.
+        """
+        self.stride = blox.width + self.PADDING
+        self.orientations = list(Orientation)
+
+        # bits of the tiles available for brick navigation, built a row at a time.
+        tiles = 0
+        for y in range(blox.height):
+            row = blox.grid[y * blox.width:(y + 1) * blox.width]
+            row_bits = ''.join('0' if value == 0 else '1' for value in reversed(row))
+            tiles |= int(row_bits, 2) << self.bit(0, y)
+
+        # bits of the tiles where the brick fits in each orientation, the padding columns hold no tiles.
+        self.valid = {
+            Orientation.STANDING: tiles,
+            Orientation.HORIZONTAL_LYING: tiles & (tiles >> 1),
+            Orientation.VERTICAL_LYING: tiles & (tiles >> self.stride),
+        }
+
+        # (orientation, direction) -> (next orientation, bit offset), derived from the brick moves.
+        self.moves = dict()
+        origin = Pos(self.PADDING, self.PADDING)
+        for orientation in self.orientations:
+            for direction in Direction:
+                next_pos = Brick(Pos(origin.x, origin.y, orientation)).next_pos(direction)
+                offset = (next_pos.y - origin.y) * self.stride + (next_pos.x - origin.x)
+                self.moves[orientation, direction] = (next_pos.orientation, offset)
+
+        # each (next orientation, direction) pair is reached from exactly one orientation,
+        # which lets the path be walked back from the direction recorded per cell.
+        self.reverse_moves = dict()
+        for (orientation, direction), (next_orientation, offset) in self.moves.items():
+            self.reverse_moves[next_orientation, direction] = (orientation, offset)
+
+    def bit(self, x: int, y: int) -> int:
+        """
+        :return: bit index of the given tile coordinates.
+        """
+        return y * self.stride + x
+
+    def search(self, start: Pos, target: Pos, order: str) -> Tuple[List[Direction], List[int]]:
+        """
+        Search the state space from the start position to the target position, a layer at a time.
+        :param start: Start position of the brick.
+        :param target: Target position of the brick.
+        :param order: Order of search directions, decides which parent claims a state reached from many.
+        :return: Tuple of the list of moves to the target (None if unreachable) and the sizes of the layers.
+        """
+        directions = Direction.get_directions(order)
+        start_bit = self.bit(start.x, start.y)
+        target_bit = self.bit(target.x, target.y)
+
+        frontier = {orientation: 0 for orientation in self.orientations}
+        frontier[start.orientation] = 1 << start_bit
+        visited = dict(frontier)
+
+        # two bit planes per orientation hold the direction of the move into each visited cell.
+        dir_planes = {orientation: [0, 0] for orientation in self.orientations}
+
+        layers = [1]
+        while not (frontier[target.orientation] >> target_bit) & 1:
+            layer = {orientation: 0 for orientation in self.orientations}
+            for orientation in self.orientations:
+                if not frontier[orientation]:
+                    continue
+                for direction in directions:
+                    next_orientation, offset = self.moves[orientation, direction]
+                    shifted = frontier[orientation] << offset if offset >= 0 else frontier[orientation] >> -offset
+                    reached = shifted & self.valid[next_orientation] & ~visited[next_orientation]
+                    claimed = reached & ~layer[next_orientation]
+                    if not claimed:
+                        continue
+                    layer[next_orientation] |= claimed
+                    code = direction.value - 1
+                    planes = dir_planes[next_orientation]
+                    if code & 1:
+                        planes[0] |= claimed
+                    if code & 2:
+                        planes[1] |= claimed
+
+            size = sum(mask.bit_count() for mask in layer.values())
+            if size == 0:
+                return None, layers
+            layers.append(size)
+
+            for orientation in self.orientations:
+                visited[orientation] |= layer[orientation]
+            frontier = layer
+
+        return self.walk_back(target, len(layers) - 1, dir_planes), layers
+
+    def walk_back(self, target: Pos, depth: int, dir_planes: dict) -> List[Direction]:
+        """
+        Walk from the target back to the start using the direction recorded per cell.
+        :param target: Target position of the brick.
+        :param depth: Layer of the target position.
+        :param dir_planes: Direction bit planes per orientation.
+        :return: List of moves from the start to the target.
+        """
+        moves = list()
+        orientation = target.orientation
+        bit = self.bit(target.x, target.y)
+        for _ in range(depth):
+            planes = dir_planes[orientation]
+            code = ((planes[0] >> bit) & 1) | (((planes[1] >> bit) & 1) << 1)
+            direction = Direction(code + 1)
+            moves.append(direction)
+            orientation, offset = self.reverse_moves[orientation, direction]
+            bit -= offset
+        moves.reverse()
+        return moves
@@ -1,16 +1,55 @@
 #!/usr/bin/env python3
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Set
 from math import sqrt, inf
 import argparse
-from heapq import heappush, heappop
-from collections import namedtuple
+import json
+import os
+import sys
+from time import perf_counter
+from heapq import heappush, heappop, heapify, nsmallest
+from array import array
 
 from orientation import Orientation
 from direction import Direction
 from brick import Brick
 from pos import Pos
-from treenode import TreeNode
+from arena import NodeArena
+from transitions import TransitionTable
+from bitset_bfs import BitsetBFS
+from heuristic_db import load_distances, UNREACHABLE
+from result import SearchResult
+from stats import SearchStats, run_profiled
+from solution_cache import SolutionCache
+from dstar_lite import DStarLite
+from open_list import OPEN_LISTS
+from events import SearchEvent, ConsoleSubscriber
+from renderer import MapRenderer
+from level import Level
+
+# values of the search arguments, shared by the argument parser, the library API and the server.
+SEARCHES = ['bfs', 'bfs-vec', 'bibfs', 'dfs', 'iddfs', 'ucs', 'greedy_bfs', 'beam', 'a-star', 'ida-star', 'ara-star',
+            'bi-astar', 'dstar-lite']
+COST_METHODS = ['euclidean', 'manhattan', 'exact', 'roll', 'roll-axis']
+OPEN_LIST_TYPES = list(OPEN_LISTS)
+
+# searches using the heuristic costs of the selected cost method.
+HEURISTIC_SEARCHES = ['greedy_bfs', 'beam', 'a-star', 'ida-star', 'ara-star', 'bi-astar']
+
+# allowed values of the search arguments with a fixed set of values, by argument name.
+ARGUMENT_CHOICES = {
+    'search': SEARCHES,
+    'cost_method': COST_METHODS,
+    'open_list': OPEN_LIST_TYPES
+}
+
+
+class UnsupportedSearch(ValueError):
+    """
+    Raised when the selected search, cost method or open list can not run on a level, e.g. the reversible searches
+    on levels with switches and bridges.
+    """
+
 
 class Bloxorz:
     """
@@ -20,188 +59,629 @@ class Bloxorz:
     For A* it uses heuristic scores based on Euclidean and Manhattan distances to the target.
     """
 
+    # heuristic costs given per state (block + orientation) rather than per block.
+    STATE_COST_METHODS = ('exact', 'roll', 'roll-axis')
+
+    # heuristics that never overestimate the cost of a move, nodes expanded by A* never need to be reopened.
+    CONSISTENT_COST_METHODS = ('exact', 'roll', 'roll-axis')
+
+    # heuristics giving integer costs, usable with the bucket open list.
+    INTEGER_COST_METHODS = ('manhattan', 'exact', 'roll', 'roll-axis')
+
+    # searches relying on every move being undone by the opposite one, which switches break.
+    REVERSIBLE_SEARCHES = ('bfs-vec', 'bibfs', 'bi-astar', 'dstar-lite')
+
+    # decrease of the heuristic weight between the iterations of ARA*.
+    WEIGHT_STEP = 0.5
+
 
-    def __init__(self, world: List[List[int]], args: argparse.Namespace):
+    def __init__(self, level: Level, args: argparse.Namespace):
         """
         Initialize the params required for BFS/DFS/A* searches.
-        :param world: The world map, m*n matrix.
-            Matrix elements with value 0 are considered unavailable tiles / holes.
-            Elements with value 1 are the regular tiles available for brick navigation.
+        :param level: The world map, a packed grid of m*n tiles.
+            Tiles with value 0 are considered unavailable tiles / holes.
+            Tiles with value 1 are the regular tiles available for brick navigation.
             Target tile is expected to have value 9.
         :param args: Extra arguments specifying the search algorithm, order, display style etc.
         """
-        self.world = world
+        self.level = level
         self.args = args
 
-        # class level variables for dfs search.
-        self.dfs_steps = 0
+        # tiles are looked up directly in the packed grid, at index y * width + x.
+        self.grid = level.grid
+        self.width = level.width
+        self.height = level.height
+
+        # state ids pack the bridge mask above the brick position: mask * num_tile_states + tile state.
+        self.num_tile_states = self.width * self.height * 3
 
         # class level variable for A* search
         self.cost_visited = dict()
 
+        # search tree nodes and the counters of the last search.
+        self.arena = NodeArena()
+        self.stats = SearchStats()
+
+        # display the search steps on the world map, turned off in headless mode.
+        self.render = not self.args.quiet
+
+        # world map display, built on the first step displayed, see show.
+        self.renderer = None
+
+        # callables receiving the search events, the console output is one of them, see subscribe.
+        self.subscribers = list()
+        if self.render or self.args.verbose:
+            self.subscribe(ConsoleSubscriber(self.render, self.args.verbose))
+
         # show application configs (verbose mode)
         self.show_args()
 
+        # incremental planner of the last d-star-lite search, kept for replanning after tile changes.
+        self.planner = None
+
+        # improved solutions of the last ara-star search, and the suboptimality bound of the path of the last search.
+        self.anytime_results = list()
+        self.bound = None
+
+        # packed state of the brick standing on the target, without the bridge mask, set by solve.
+        self.target_state = self.pack_state(Pos(level.target[0], level.target[1], Orientation.STANDING), 0)
+
+        # optional cache of the search results, in memory and on disk.
+        self.solutions = None
+        if self.args.solution_cache:
+            self.solutions = SolutionCache(os.path.join(self.args.cache_dir, 'solutions'))
+
+        # heuristic cost tables by (cost method, target state id), shared by all the searches on this world map.
+        self.heuristic_costs = dict()
+
+        # optional successor table, shared by all the searches on this world map.
+        self.transitions = None
+        self.precompute_time = 0.0
+        if self.args.precompute:
+            self.build_transitions()
+
+    def build_transitions(self):
+        """
+        Precompute the state transition table of the current world map.
+        """
+        start_time = perf_counter()
+        self.transitions = TransitionTable(self, self.args.order)
+        self.precompute_time = perf_counter() - start_time
+        self.debug("transition table: {} states, {} moves, built in {:.2f} ms\n".format(
+            self.transitions.num_states, len(self.transitions), self.precompute_time * 1000))
+
+    def solve(self, start: Pos, target_pos: Pos) -> SearchResult:
+        """
+        Run the search algorithm selected in the arguments.
+        With the solution cache, a result stored for the same level, positions and search configuration is
+        returned without searching.
+        :param start: Start position of the brick.
+        :param target_pos: target position.
+        :return: SearchResult with the path found, its cost, the search stats and the search time.
+        """
+        self.stats = SearchStats()
+        self.bound = None
+        self.target_state = self.pack_state(target_pos, 0)
+        start_time = perf_counter()
+
+        if self.solutions is not None:
+            key = self.solutions.key(self, start, target_pos)
+            cached = self.solutions.get(key)
+            if cached is not None:
+                result = SearchResult.from_dict(cached, perf_counter() - start_time, True)
+                self.stats = result.stats
+                if result.path is not None:
+                    self.show_completed("CACHED", self.replay_path(start, result.path), "Path")
+                return result
+
+        search = self.args.search
+        if search in self.REVERSIBLE_SEARCHES and not self.level.is_static():
+            raise UnsupportedSearch("Search '{}' is not supported on levels with switches and bridges".format(search))
+
+        if search == 'bfs':
+            goal = self.solve_by_bfs(start)
+        elif search == 'bfs-vec':
+            goal = self.solve_by_bfs_vec(start, target_pos)
+        elif search == 'bibfs':
+            goal = self.solve_by_bibfs(start, target_pos)
+        elif search == 'dfs':
+            goal = self.solve_by_dfs(start)
+        elif search == 'iddfs':
+            goal = self.solve_by_iddfs(start)
+        elif search == 'ucs':
+            goal = self.solve_by_ucs(start)
+        elif search == 'greedy_bfs':
+            goal = self.solve_by_greedy_best_first(start, target_pos)
+        elif search == 'beam':
+            goal = self.solve_by_beam(start, target_pos)
+        elif search == 'a-star':
+            goal = self.solve_by_astar(start, target_pos)
+        elif search == 'ida-star':
+            goal = self.solve_by_ida_star(start, target_pos)
+        elif search == 'ara-star':
+            goal = self.solve_by_ara_star(start, target_pos)
+        elif search == 'bi-astar':
+            goal = self.solve_by_bi_astar(start, target_pos)
+        elif search == 'dstar-lite':
+            goal = self.solve_by_dstar_lite(start, target_pos)
+        else:
+            raise ValueError("NO SUCH SEARCH ALGORITHM KNOWN '{}'".format(search))
+        elapsed = perf_counter() - start_time
+        self.stats.search_time = elapsed - self.stats.setup_time - self.stats.render_time
+
+        if goal is not None and self.subscribers:
+            self.emit(SearchEvent.GOAL, goal)
+
+        path = None if goal is None else self.arena.path(goal)
+        result = SearchResult(path, self.stats, elapsed, bound=self.bound)
+        if self.solutions is not None:
+            self.solutions.put(key, result.to_dict())
+        return result
+
     """
     BFS SPECIFIC FUNCTIONS
     """
 
-    def solve_by_bfs(self, head: TreeNode):
+    def solve_by_bfs(self, start: Pos) -> int:
         """
         Search the state space using BFS search.
-        :param head: Tree head node.
+        :param start: Start position of the brick.
+        :return: Arena index of the goal node, None if the target is unreachable.
         """
+        self.arena = NodeArena()
+        head = self.arena.add(self.pack_state(start))
 
-        # visited list to store visited position on the world map.
-        visited_pos = list()
-        visited_pos.append(head.brick.pos)
+        # visited set to store packed state ids of the visited positions on the world map.
+        visited_states = set()
+        visited_states.add(self.arena.state[head])
+
+        # nodes are appended to the arena in the order they are encountered at each level of the tree,
+        # so the arena itself serves as the BFS queue.
+        node = head
+        self.stats.frontier(1)
+        while node < len(self.arena):
+            self.stats.frontier(len(self.arena) - node)
+            if self.subscribers:
+                self.emit(SearchEvent.EXPANDED, node)
+            self.stats.expanded += 1
+            if self.is_target_state(self.arena.state[node]):
+                self.show_completed("BFS", node)
+                return node
+
+            for next_state, direction in self.next_valid_move(node, visited_states):
+                # add a new node for next_state, linked to the current node.
+                new_node = self.arena.add(next_state, node, self.arena.g_cost[node] + 1, direction)
+                visited_states.add(next_state)
+                self.stats.generated += 1
+                if self.subscribers:
+                    self.emit(SearchEvent.GENERATED, new_node)
+
+            node += 1
+
+        return None
+
+    def solve_by_bfs_vec(self, start: Pos, target_pos: Pos) -> int:
+        """
+        Search the state space using BFS, expanding a whole layer of the tree at once over state bitsets.
+        :param start: Start position of the brick.
+        :param target_pos: target position.
+        :return: Arena index of the goal node, None if the target is unreachable.
+        """
+        moves, layers = BitsetBFS(self).search(start, target_pos, self.args.order)
 
-        # queue to hold nodes encountered at each level of the tree.
-        node_queue = list()
-        node_queue.append(head)
+        # show the size of each layer of the BFS tree.
+        self.stats.expanded = sum(layers)
+        self.stats.generated = self.stats.expanded - 1
+        self.stats.frontier(max(layers))
+        if self.render:
+            for depth, size in enumerate(layers):
+                print("Layer: {}, States: {}".format(depth, size))
 
-        steps = 0
-        while len(node_queue) > 0:
-            node = node_queue.pop(0)
-            self.debug("{:10s}: {:21s} - {}".format("removed", "frontier node", str(node)))
+        if moves is None:
+            return None
 
-            # show the BFS tree.
-            print("Step: {}, Depth: {}, - {}".format(steps, self.get_node_depth(node), str(node)))
-            self.show(node.brick)
+        node = self.replay_path(start, moves)
+        self.show_completed("VECTORIZED BFS", node)
+        return node
 
-            steps += 1
-            if self.is_target_state(node.brick.pos):
-                print("\nBFS SEARCH COMPLETED !")
-                print("Optimal path is as below -> \n")
-                self.show_optimal_path(node)
-                return
+    """
+    BIDIRECTIONAL SEARCH SPECIFIC FUNCTIONS
+    Every roll of the brick can be undone by a roll in the opposite direction, so a search tree grown from
+    the target with the regular moves holds the reversed paths to the target.
+    """
 
-            for next_pos, direction in self.next_valid_move(node, visited_pos):
-                # create a new brick with next_pos, initialize a new node with brick position
-                new_brick = Brick(next_pos)
-                new_node = TreeNode(new_brick)
+    def solve_by_bibfs(self, start: Pos, target_pos: Pos) -> int:
+        """
+        Search the state space using BFS from both the start and the target positions, until the two trees meet.
+        :param start: Start position of the brick.
+        :param target_pos: target position.
+        :return: Arena index of the goal node, None if the target is unreachable.
+        """
+        self.arena = NodeArena()
+        backward = NodeArena()
+
+        # search side -> (arena, state id -> node index, frontier nodes)
+        sides = {
+            "forward": (self.arena, dict(), [self.arena.add(self.pack_state(start))]),
+            "backward": (backward, dict(), [backward.add(self.pack_state(target_pos))])
+        }
+        for arena, seen, frontier in sides.values():
+            seen[arena.state[frontier[0]]] = frontier[0]
+
+        if self.pack_state(start) == self.pack_state(target_pos):
+            return self.stitch_path(0, backward, 0)
+
+        self.stats.frontier(2)
+        while len(sides["forward"][2]) > 0 and len(sides["backward"][2]) > 0:
+            self.stats.frontier(len(sides["forward"][2]) + len(sides["backward"][2]))
+
+            # grow the tree with the smaller frontier by a whole layer.
+            side = "forward" if len(sides["forward"][2]) <= len(sides["backward"][2]) else "backward"
+            other = "backward" if side == "forward" else "forward"
+            arena, seen, frontier = sides[side]
+            other_arena, other_seen, _ = sides[other]
+
+            # shortest (cost, node in this tree, node in the other tree) meeting of the two trees in this layer.
+            meeting = None
+            next_frontier = list()
+            for node in frontier:
+                if self.subscribers:
+                    self.emit(SearchEvent.EXPANDED, node, arena)
+                self.stats.expanded += 1
+
+                for next_state, direction in self.next_valid_move(node, seen, arena):
+                    new_node = arena.add(next_state, node, arena.g_cost[node] + 1, direction)
+                    seen[next_state] = new_node
+                    next_frontier.append(new_node)
+                    self.stats.generated += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.GENERATED, new_node, arena)
+
+                    if next_state in other_seen:
+                        cost = arena.g_cost[new_node] + other_arena.g_cost[other_seen[next_state]]
+                        if meeting is None or cost < meeting[0]:
+                            meeting = (cost, new_node, other_seen[next_state])
+
+            if meeting is not None:
+                _, node, other_node = meeting
+                if side == "forward":
+                    goal = self.stitch_path(node, backward, other_node)
+                else:
+                    goal = self.stitch_path(other_node, backward, node)
+                self.show_completed("BIDIRECTIONAL BFS", goal)
+                return goal
 
-                # set the 4 direction attributes
-                setattr(node, direction.name.lower(), new_node)
+            sides[side] = (arena, seen, next_frontier)
 
-                # and parent node of the new node.
-                new_node.parent = node
-                new_node.dir_from_parent = direction
+        return None
 
-                node_queue.append(new_node)
-                visited_pos.append(next_pos)
-                self.debug("{:10s}: {:21s} - {}".format("added", "new node", str(new_node)))
+    def solve_by_bi_astar(self, start: Pos, target_pos: Pos) -> int:
+        """
+        Solve the Bloxorz problem using A* from both the start and the target positions.
+        The forward search estimates the cost to the target, the backward search the cost to the start.
+        The search stops once no open node on either side can lead to a cheaper path than the best meeting found.
+        :param start: Start position of the brick.
+        :param target_pos: target position.
+        :return: Arena index of the goal node, None if the target is unreachable.
+        """
+        self.arena = NodeArena()
+        backward = NodeArena()
+
+        # search side -> (arena, state id -> best node index, heuristic costs, open nodes min-heap)
+        sides = {
+            "forward": (self.arena, dict(), self.compute_heuristic_costs(target_pos), list()),
+            "backward": (backward, dict(), self.compute_heuristic_costs(start), list())
+        }
+        for side, root in (("forward", start), ("backward", target_pos)):
+            arena, best, h_costs, open_nodes = sides[side]
+            head = arena.add(self.pack_state(root))
+            best[arena.state[head]] = head
+            heappush(open_nodes, (self.min_h_cost(h_costs, arena.state[head]), head))
+
+        # cost of the best path found and its (forward node, backward node) meeting point.
+        best_cost = inf
+        meeting = None
+        if self.pack_state(start) == self.pack_state(target_pos):
+            best_cost, meeting = 0, (0, 0)
+
+        self.stats.frontier(2)
+        while len(sides["forward"][3]) > 0 and len(sides["backward"][3]) > 0:
+            self.stats.frontier(len(sides["forward"][3]) + len(sides["backward"][3]))
+
+            # both open lists hold lower bounds on any path through their nodes.
+            if max(sides["forward"][3][0][0], sides["backward"][3][0][0]) >= best_cost:
+                break
 
-        return
+            # expand a node from the smaller open list.
+            side = "forward" if len(sides["forward"][3]) <= len(sides["backward"][3]) else "backward"
+            other = "backward" if side == "forward" else "forward"
+            arena, best, h_costs, open_nodes = sides[side]
+            other_arena, other_best, _, _ = sides[other]
+
+            f_cost, node = heappop(open_nodes)
+            state = arena.state[node]
+            if best[state] != node:
+                # a cheaper node for the same state was found after this one was added.
+                if self.subscribers:
+                    self.emit(SearchEvent.PRUNED, node, arena, f_cost=f_cost)
+                continue
+
+            if self.subscribers:
+                self.emit(SearchEvent.EXPANDED, node, arena, f_cost=f_cost)
+            self.stats.expanded += 1
+
+            for next_state, direction in self.next_valid_move(node, None, arena):
+                g_cost = arena.g_cost[node] + 1
+                if next_state in best and g_cost >= arena.g_cost[best[next_state]]:
+                    self.stats.rejected_visited += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.REJECTED_VISITED, node, arena, direction)
+                    continue
+
+                if next_state in best:
+                    self.stats.reopened += 1
+                new_node = arena.add(next_state, node, g_cost, direction)
+                best[next_state] = new_node
+                self.stats.generated += 1
+                h_cost = self.min_h_cost(h_costs, next_state)
+                heappush(open_nodes, (g_cost + h_cost, new_node))
+                if self.subscribers:
+                    self.emit(SearchEvent.GENERATED, new_node, arena, f_cost=g_cost + h_cost)
+
+                if next_state in other_best:
+                    other_node = other_best[next_state]
+                    cost = g_cost + other_arena.g_cost[other_node]
+                    if cost < best_cost:
+                        best_cost = cost
+                        meeting = (new_node, other_node) if side == "forward" else (other_node, new_node)
+
+        if meeting is None:
+            return None
+
+        goal = self.stitch_path(meeting[0], backward, meeting[1])
+        self.show_completed("BIDIRECTIONAL A*", goal)
+        return goal
+
+    def stitch_path(self, node: int, backward: NodeArena, backward_node: int) -> int:
+        """
+        Join the branch of the backward tree to the forward tree at their meeting state.
+        Nodes are added to the forward arena, undoing the moves of the backward tree from the meeting state up to
+        its root (the target).
+        :param node: Forward arena index of the meeting node.
+        :param backward: Arena of the backward tree.
+        :param backward_node: Backward arena index of the meeting node.
+        :return: Forward arena index of the goal node.
+        """
+        while backward.parent[backward_node] != NodeArena.NO_PARENT:
+            direction = backward.get_direction(backward_node).opposite()
+            backward_node = backward.parent[backward_node]
+            node = self.arena.add(backward.state[backward_node], node, self.arena.g_cost[node] + 1, direction)
+        return node
 
     """
     DFS SPECIFIC FUNCTIONS. 
     """
 
-    def solve_by_dfs(self, node: TreeNode, visited_pos: List = None):
+    def solve_by_dfs(self, start: Pos) -> int:
         """
         Search the state space using DFS algorithm.
-        :param node: Tree node.
-        :param visited_pos: List containing visited positions.
+        An explicit stack of move generators replaces recursion, so the search depth is not bound by the
+        interpreter's recursion limit. Nodes deeper than --depth-limit are not expanded.
+        :param start: Start position of the brick.
+        :return: Arena index of the goal node, None if the target was not found.
         """
+        self.arena = NodeArena()
+        head = self.arena.add(self.pack_state(start))
 
-        if visited_pos is None:
-            visited_pos = list()
-            visited_pos.append(node.brick.pos)
+        visited_states = set()
+        visited_states.add(self.arena.state[head])
 
-        print("Step: {}, Depth: {} - {}".format(self.dfs_steps, self.get_node_depth(node), str(node)))
-        self.show(node.brick)
-        self.dfs_steps += 1
+        self.stats.frontier(1)
+        stack = list()
+        node = head
+        while True:
+            if node is not None:
+                if self.subscribers:
+                    self.emit(SearchEvent.EXPANDED, node)
+                self.stats.expanded += 1
+
+                if self.is_target_state(self.arena.state[node]):
+                    self.show_completed("DFS", node, "Path")
+                    return node
+
+                if self.args.depth_limit is None or self.get_node_depth(node) < self.args.depth_limit:
+                    stack.append((node, self.next_valid_move(node, visited_states)))
+                    self.stats.frontier(len(stack))
+
+            if len(stack) == 0:
+                self.show_failed("DFS")
+                return None
+
+            # visit the next unvisited child of the deepest node with moves left.
+            parent, moves = stack[-1]
+            next_move = next(moves, None)
+            if next_move is None:
+                stack.pop()
+                node = None
+                continue
+
+            next_state, direction = next_move
+            node = self.arena.add(next_state, parent, self.arena.g_cost[parent] + 1, direction)
+            visited_states.add(next_state)
+            self.stats.generated += 1
+            if self.subscribers:
+                self.emit(SearchEvent.GENERATED, node)
 
-        if self.is_target_state(node.brick.pos):
-            # with dfs, we are in deep recursion, 'return' won't exit the entire stack.
-            exit(0)
+    """
+    IDDFS SPECIFIC FUNCTIONS
+    """
 
-        for next_pos, direction in self.next_valid_move(node, visited_pos):
+    def solve_by_iddfs(self, start: Pos) -> int:
+        """
+        Search the state space using iterative deepening DFS.
+        Depth limited DFS is repeated with limits 0, 1, 2, ... so the first goal found is at the lowest depth.
+        Only the nodes on the current path are kept in the arena.
+        :param start: Start position of the brick.
+        :return: Arena index of the goal node, None if the target is unreachable within --depth-limit.
+        """
+        self.stats.frontier(1)
+        limit = 0
+        while self.args.depth_limit is None or limit <= self.args.depth_limit:
+            if self.render:
+                print("Depth limit: {}".format(limit))
+            goal, cutoff = self.depth_limited_dfs(start, limit)
+            if goal is not None:
+                self.show_completed("IDDFS", goal)
+                return goal
+
+            # no node was left unexpanded for reaching the limit, the whole reachable space was searched.
+            if not cutoff:
+                break
+            limit += 1
+
+        self.show_failed("IDDFS")
+        return None
 
-            # create a new brick with next_pos, initialize a new node with brick position
-            # and recursively make the state tree.
-            new_brick = Brick(next_pos)
-            new_node = TreeNode(new_brick)
+    def depth_limited_dfs(self, start: Pos, limit: int) -> Tuple[int, bool]:
+        """
+        Search the state space using DFS, without expanding nodes at the depth limit.
+        A state is visited again only if it is reached at a lower depth than before, so a state first reached
+        by a long detour can still lead to a goal within the limit.
+        :param start: Start position of the brick.
+        :param limit: Depth limit.
+        :return: Tuple of the goal node arena index (None if not found) and
+            whether a state was left unexpanded at the depth limit, never reached at a lower depth.
+        """
+        self.arena = NodeArena()
+        head = self.arena.add(self.pack_state(start))
 
-            # set the 4 direction attributes
-            setattr(node, direction.name.lower(), new_node)
+        # packed state id -> lowest depth at which it was reached in this iteration.
+        visited_depths = dict()
+        visited_depths[self.arena.state[head]] = 0
 
-            # and parent node of the new node.
-            new_node.parent = node
-            new_node.dir_from_parent = direction
-            visited_pos.append(next_pos)
+        # states of the nodes left unexpanded at the depth limit.
+        cut_states = set()
+        stack = list()
+        node = head
+        while True:
+            if node is not None:
+                if self.subscribers:
+                    self.emit(SearchEvent.EXPANDED, node)
+                self.stats.expanded += 1
 
-            self.debug("{:10s}: {:21s} - {}".format("to visit", "new node", str(new_node)))
-            self.solve_by_dfs(new_node, visited_pos)
-        return
+                if self.is_target_state(self.arena.state[node]):
+                    return node, len(cut_states) > 0
+
+                if self.get_node_depth(node) < limit:
+                    stack.append((node, self.next_valid_move(node)))
+                    self.stats.frontier(len(stack))
+                else:
+                    cut_states.add(self.arena.state[node])
+
+            if len(stack) == 0:
+                # states also reached at a lower depth were expanded, their moves were searched within the limit.
+                return None, any(visited_depths[state] >= limit for state in cut_states)
+
+            parent, moves = stack[-1]
+            next_move = next(moves, None)
+            if next_move is None:
+                # the subtree of the parent is exhausted, drop its nodes.
+                stack.pop()
+                self.arena.truncate(parent + 1)
+                node = None
+                continue
+
+            next_state, direction = next_move
+            depth = self.get_node_depth(parent) + 1
+            if next_state in visited_depths and visited_depths[next_state] <= depth:
+                self.stats.rejected_visited += 1
+                if self.subscribers:
+                    self.emit(SearchEvent.REJECTED_VISITED, parent, direction=direction)
+                node = None
+                continue
+
+            visited_depths[next_state] = depth
+            self.arena.truncate(parent + 1)
+            node = self.arena.add(next_state, parent, self.arena.g_cost[parent] + 1, direction)
+            self.stats.generated += 1
+            if self.subscribers:
+                self.emit(SearchEvent.GENERATED, node)
 
     """
     UCS SPECIFIC FUNCTIONS
     """
-    def solve_by_ucs(self, head: TreeNode):
+    def new_open_list(self, heuristic: bool = True):
+        """
+        Empty open list of the UCS and A* searches, with the --open-list backend (see open_list.py).
+        Nodes are popped by lowest f cost, then highest g cost, then insertion order, with either backend.
+        :param heuristic: The f costs include the heuristic costs of the selected cost method.
+        :return: HeapOpenList or BucketOpenList object, raise UnsupportedSearch if the bucket open list is selected
+            with a cost method giving non integer costs.
+        """
+        if self.args.open_list == 'bucket' and heuristic and self.args.cost_method not in self.INTEGER_COST_METHODS:
+            raise UnsupportedSearch("Open list 'bucket' needs integer costs, cost method '{}' is not supported".format(
+                self.args.cost_method))
+        return OPEN_LISTS[self.args.open_list]()
+
+    def solve_by_ucs(self, start: Pos) -> int:
         """
         Solve the Bloxorz problem using UCS algorithm.
-        :param head: head node.
+        :param start: Start position of the brick.
+        :return: Arena index of the goal node, None if the target is unreachable.
         """
+        self.arena = NodeArena()
+        self.cost_visited = dict()
+        head = self.arena.add(self.pack_state(start))
 
-        self.set_cost_visited(head.brick.pos, 0)
+        self.set_cost_visited(self.arena.state[head], 0)
 
-        expanded_nodes = list()
+        # open list of the --open-list backend, nodes popped by lowest f cost.
+        expanded_nodes = self.new_open_list(False)
+        expanded_nodes.push(0, 0, head)
 
-        steps = 0
-        node = head
+        self.stats.frontier(1)
+        while len(expanded_nodes) > 0:
+            self.stats.frontier(len(expanded_nodes))
+            f_cost, node = expanded_nodes.pop()
+
+            # update cost of this node
+            self.set_cost_visited(self.arena.state[node], self.arena.g_cost[node])
 
-        print("Step: {}, Depth: {}, Cost: {} - {}".format(
-                steps, self.get_node_depth(head), self.get_cost_visited(head.brick.pos), str(head)))
-        self.show(head.brick)
+            if self.subscribers:
+                self.emit(SearchEvent.EXPANDED, node, f_cost=f_cost)
+            self.stats.expanded += 1
 
-        while True:
-            for next_pos, direction in self.next_valid_move(node, []):
+            # if goal state is dequeued, mark the search as completed.
+            if self.is_target_state(self.arena.state[node]):
+                self.show_completed("UCS", node)
+                return node
+
+            for next_state, direction in self.next_valid_move(node):
 
-                g_cost = self.get_cost_visited(node.brick.pos) + 1
+                g_cost = self.get_cost_visited(self.arena.state[node]) + 1
 
                 # if the node is not visited, add to expanded queue.
                 # if the node is visited, but has lower actual cost than previously recorded, add to expanded queue.
-                if next_pos not in self.cost_visited or g_cost < self.get_cost_visited(next_pos):
-                    # new node and estimated cost.
-                    new_node = TreeNode(Brick(next_pos))
-                    new_node.f_cost = g_cost
-
-                    self.set_cost_visited(new_node.brick.pos, g_cost)
-                    # set current node's child pointer.
-                    setattr(node, direction.name.lower(), new_node)     # node.{left|right|up|down} -> new_node
-
-                    # link new_node to the current node.
-                    new_node.parent = node
-                    new_node.dir_from_parent = direction
-                    heappush(expanded_nodes, new_node)
-                    self.debug("{:10s}: {:21s} - {} [g_cost: {}] ".format(
-                        "added", "new | visited & cheap", str(new_node), g_cost))
+                if next_state not in self.cost_visited or g_cost < self.get_cost_visited(next_state):
+                    if next_state in self.cost_visited:
+                        self.stats.reopened += 1
+
+                    # new node and estimated cost, linked to the current node.
+                    new_node = self.arena.add(next_state, node, g_cost, direction)
+                    f_cost = g_cost
+
+                    self.set_cost_visited(next_state, g_cost)
+                    expanded_nodes.push(f_cost, g_cost, new_node)
+                    self.stats.generated += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.GENERATED, new_node, f_cost=f_cost)
                 else:
-                    self.debug("{:10s}: {:21s} - [hash(Parent): {}, Parent->{}] [Cost now: {}, earlier: {}]".format(
-                        "rejected", "visited & costly", hash(node), direction.name.lower(), g_cost,
-                        self.get_cost_visited(next_pos)))
-
-            node = heappop(expanded_nodes)
-            self.debug("{:10s}: {:21s} - {}".format("removed", "frontier node", str(node)))
-
-            # update cost of this node
-            self.set_cost_visited(node.brick.pos, self.get_cost_visited(node.parent.brick.pos) + 1)
-
-            steps += 1
-            print("Step: {}, Depth: {}, Cost: {} - {} [f_cost: {:.2f}]".format(
-                steps, self.get_node_depth(node), self.get_cost_visited(node.brick.pos), str(node), node.f_cost))
-            self.show(node.brick)
-
-            # if goal state is dequeued, mark the search as completed.
-            if self.is_target_state(node.brick.pos):
-                break
+                    self.stats.rejected_visited += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.REJECTED_VISITED, node, direction=direction)
 
-        print("\nUCS SEARCH COMPLETED !")
-        print("Optimal path is as below -> \n")
-        self.show_optimal_path(node)
-        return
+        self.show_failed("UCS")
+        return None
 
     """
     A* SEARCH SPECIFIC FUNCTIONS
@@ -224,16 +704,66 @@ class Bloxorz:
         """
         return abs(pos1.x - pos2.x) + abs(pos1.y - pos2.y)
 
+    def distance_rolling(self, pos1: Pos, pos2: Pos, per_axis: bool) -> int:
+        """
+        Compute a lower bound on the number of rolls between two brick positions, orientation included.
+        Every roll moves the doubled brick center by 2 or 3 along a single axis, so the manhattan distance of
+        the doubled centers divided by 3 never overestimates, and changes by at most 1 per roll.
+        Counted per axis, a displacement of 1 can only be covered by two rolls (+3 - 2), as the parity of a
+        doubled center coordinate tells whether the brick is lying along that axis.
+        :param pos1: First Position object.
+        :param pos2: Second Position object.
+        :param per_axis: count the rolls along each axis separately.
+        :return: Minimum number of rolls from one position to the other.
+        """
+        (x1, y1), (x2, y2) = Brick(pos1).get_doubled_center(), Brick(pos2).get_doubled_center()
+        dx, dy = abs(x1 - x2), abs(y1 - y2)
+        if not per_axis:
+            return (dx + dy + 2) // 3
+
+        rolls = 0
+        for delta in (dx, dy):
+            rolls += 2 if delta == 1 else (delta + 2) // 3
+        return rolls
+
     def compute_heuristic_costs(self, target_pos: Pos) -> Dict:
+        """
+        Heuristic costs for each block on the world map to the target block, computed on the first search
+        towards the target with the selected cost method and reused by the later ones.
+        :param target_pos: Target block position.
+        :return: dictionary containing heuristics cost.
+        """
+        start_time = perf_counter()
+        key = (self.args.cost_method, self.pack_state(target_pos))
+        if key not in self.heuristic_costs:
+            self.heuristic_costs[key] = self.build_heuristic_costs(target_pos)
+        self.stats.setup_time += perf_counter() - start_time
+        return self.heuristic_costs[key]
+
+    def build_heuristic_costs(self, target_pos: Pos) -> Dict:
         """
         Compute heuristic costs for each block on the world map to the target block.
+        With the exact and rolling cost methods, the costs are given for each state (block + orientation).
+        The exact costs are the true distances to the target, loaded from the on-disk cache.
         :param target_pos: Target block position.
         :return: dictionary containing heuristics cost.
         """
+        if self.args.cost_method == 'exact':
+            if not self.level.is_static():
+                raise UnsupportedSearch("Cost method 'exact' is not supported on levels with switches and bridges")
+            return load_distances(self, target_pos, self.args.cache_dir)
+
+        if self.args.cost_method in self.STATE_COST_METHODS:
+            costs = array('i')
+            for state in range(self.num_tile_states):
+                costs.append(self.distance_rolling(
+                    self.unpack_state(state), target_pos, self.args.cost_method == 'roll-axis'))
+            return costs
+
         costs = dict()
         num = 0
-        for y in range(len(self.world)):
-            for x in range(len(self.world[0])):
+        for y in range(self.height):
+            for x in range(self.width):
                 pos = Pos(x, y)
                 if not self.is_off_map(pos):
                     if self.args.cost_method == 'euclidean':
@@ -245,156 +775,564 @@ class Bloxorz:
                 num += 1
         return costs
 
-    def min_h_cost(self, h_costs: dict, node: TreeNode):
+    def min_h_cost(self, h_costs: dict, state: int):
         """
-        Given a node, identify brick orientation and determine the minimum heuristic cost to the target.
+        Given a state, identify brick orientation and determine the minimum heuristic cost to the target.
         :param h_costs: dictionary containing heuristic costs
-        :param node: node object.
+        :param state: packed state id.
         :return: heuristic cost value.
         """
-        pos = node.brick.pos
+        self.stats.heuristic_evals += 1
+        if self.args.cost_method == 'exact':
+            distance = h_costs[state % self.num_tile_states]
+            return inf if distance == UNREACHABLE else distance
+
+        if self.args.cost_method in self.STATE_COST_METHODS:
+            return h_costs[state % self.num_tile_states]
+
+        pos = self.unpack_state(state)
 
         if pos.orientation is Orientation.STANDING:
-            return h_costs[pos.y * len(self.world[0]) + pos.x]
+            return h_costs[pos.y * self.width + pos.x]
 
         if pos.orientation is Orientation.VERTICAL_LYING:
-            return min(h_costs[pos.y * len(self.world[0]) + pos.x], h_costs[(pos.y + 1) * len(self.world[0]) + pos.x])
+            return min(h_costs[pos.y * self.width + pos.x], h_costs[(pos.y + 1) * self.width + pos.x])
 
         if pos.orientation is Orientation.HORIZONTAL_LYING:
-            return min(h_costs[pos.y * len(self.world[0]) + pos.x], h_costs[pos.y * len(self.world[0]) + (pos.x + 1)])
+            return min(h_costs[pos.y * self.width + pos.x], h_costs[pos.y * self.width + (pos.x + 1)])
 
-    def solve_by_astar(self, head: TreeNode, target_pos: Pos):
+    def solve_by_astar(self, start: Pos, target_pos: Pos) -> int:
         """
         Solve the Bloxorz problem using A* algorithm.
-        :param head: head node.
+        Entries of the open list made stale by a cheaper path to their state are skipped when popped.
+        With a consistent heuristic, expanded states go to a closed set and are never reopened.
+        :param start: Start position of the brick.
         :param target_pos: target position for heuristic estimates.
+        :return: Arena index of the goal node, None if the target is unreachable.
         """
+        self.arena = NodeArena()
+        self.cost_visited = dict()
+        head = self.arena.add(self.pack_state(start))
+        target_state = self.pack_state(target_pos, 0)
+
+        # open list of the --open-list backend, nodes popped by lowest f cost.
+        expanded_nodes = self.new_open_list()
 
         # compute the heuristic cost from all valid positions to the target positions
         heuristic_costs = self.compute_heuristic_costs(target_pos)
-        head.f_cost = self.min_h_cost(heuristic_costs, head)
-        self.set_cost_visited(head.brick.pos, 0)
+        self.set_cost_visited(self.arena.state[head], 0)
 
-        expanded_nodes = list()
+        # closed states are only checked with heuristics that guarantee optimal costs at expansion.
+        closed_states = set() if self.args.cost_method in self.CONSISTENT_COST_METHODS else None
 
-        steps = 0
-        node = head
+        expanded_nodes.push(self.min_h_cost(heuristic_costs, self.arena.state[head]), 0, head)
 
-        print("Step: {}, Depth: {}, Cost: {} - {}".format(
-                steps, self.get_node_depth(head), self.get_cost_visited(head.brick.pos), str(head)))
-        self.show(head.brick)
+        self.stats.frontier(1)
+        while len(expanded_nodes) > 0:
+            self.stats.frontier(len(expanded_nodes))
+            f_cost, node = expanded_nodes.pop()
+            state = self.arena.state[node]
 
-        while True:
-            for next_pos, direction in self.next_valid_move(node, []):
+            # a cheaper path to the same state was found after this node was added.
+            if self.arena.g_cost[node] > self.get_cost_visited(state):
+                if self.subscribers:
+                    self.emit(SearchEvent.PRUNED, node, f_cost=f_cost)
+                continue
 
-                g_cost = self.get_cost_visited(node.brick.pos) + 1
+            if closed_states is not None:
+                closed_states.add(state)
+
+            if self.subscribers:
+                self.emit(SearchEvent.EXPANDED, node, f_cost=f_cost)
+            self.stats.expanded += 1
+
+            # if goal state is dequeued (with any bridge mask), mark the search as completed.
+            if state % self.num_tile_states == target_state:
+                self.show_completed("A*", node)
+                return node
+
+            for next_state, direction in self.next_valid_move(node, closed_states):
+
+                g_cost = self.get_cost_visited(state) + 1
 
                 # if the node is not visited, add to expanded queue.
                 # if the node is visited, but has lower actual cost than previously recorded, add to expanded queue.
-                if next_pos not in self.cost_visited or g_cost < self.get_cost_visited(next_pos):
-                    # new node and estimated cost.
-                    new_node = TreeNode(Brick(next_pos))
-                    h_cost = self.min_h_cost(heuristic_costs, new_node)
-
-                    new_node.f_cost = g_cost + h_cost
-                    # set current node's child pointer.
-                    setattr(node, direction.name.lower(), new_node)     # node.{left|right|up|down} -> new_node
-
-                    # link new_node to the current node.
-                    new_node.parent = node
-                    new_node.dir_from_parent = direction
-                    heappush(expanded_nodes, new_node)
-                    self.debug("{:10s}: {:21s} - {} [f_cost: {:.2f} = {} + {:.2f}] ".format(
-                        "added", "new | visited & cheap", str(new_node), new_node.f_cost, g_cost, h_cost))
+                if next_state not in self.cost_visited or g_cost < self.get_cost_visited(next_state):
+                    if next_state in self.cost_visited:
+                        self.stats.reopened += 1
+
+                    # new node and estimated cost, linked to the current node.
+                    new_node = self.arena.add(next_state, node, g_cost, direction)
+                    h_cost = self.min_h_cost(heuristic_costs, next_state)
+
+                    self.set_cost_visited(next_state, g_cost)
+                    expanded_nodes.push(g_cost + h_cost, g_cost, new_node)
+                    self.stats.generated += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.GENERATED, new_node, f_cost=g_cost + h_cost)
                 else:
-                    self.debug("{:10s}: {:21s} - [hash(Parent): {}, Parent->{}] [Cost now: {}, earlier: {}]".format(
-                        "rejected", "visited & costly", hash(node), direction.name.lower(), g_cost,
-                        self.get_cost_visited(next_pos)))
+                    self.stats.rejected_visited += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.REJECTED_VISITED, node, direction=direction)
 
-            node = heappop(expanded_nodes)
-            self.debug("{:10s}: {:21s} - {}".format("removed", "frontier node", str(node)))
+        self.show_failed("A*")
+        return None
 
-            # update cost of this node
-            self.set_cost_visited(node.brick.pos,  self.get_cost_visited(node.parent.brick.pos) + 1)
+    """
+    IDA* SEARCH SPECIFIC FUNCTIONS
+    """
+    def solve_by_ida_star(self, start: Pos, target_pos: Pos) -> int:
+        """
+        Solve the Bloxorz problem using iterative deepening A*.
+        Cost limited DFS is repeated with the f cost bound raised each time to the lowest f cost that exceeded it,
+        so with an admissible heuristic the first goal found is an optimal one. Only the nodes on the current path
+        are kept, memory grows with the solution depth instead of the number of states generated.
+        Nodes are expanded again in every iteration; the transposition table (--tt-size) trades a bounded amount
+        of memory for fewer repeated expansions within an iteration, and ends the search on unreachable targets
+        when it holds all the states reached.
+        :param start: Start position of the brick.
+        :param target_pos: target position for heuristic estimates.
+        :return: Arena index of the goal node, None if the target is unreachable.
+        """
+        heuristic_costs = self.compute_heuristic_costs(target_pos)
+        bound = self.min_h_cost(heuristic_costs, self.pack_state(start))
 
-            steps += 1
-            print("Step: {}, Depth: {}, Cost: {} - {} [f_cost: {:.2f}]".format(
-                steps, self.get_node_depth(node), self.get_cost_visited(node.brick.pos), str(node), node.f_cost))
-            self.show(node.brick)
+        self.stats.frontier(1)
+        while bound < inf:
+            if self.render:
+                print("f cost bound: {:.2f}".format(bound))
+            goal, bound = self.cost_limited_dfs(start, heuristic_costs, bound)
+            if goal is not None:
+                self.show_completed("IDA*", goal)
+                return goal
 
-            # if goal state is dequeued, mark the search as completed.
-            if node.brick.pos == target_pos:
-                break
+        self.show_failed("IDA*")
+        return None
+
+    def cost_limited_dfs(self, start: Pos, heuristic_costs: Dict, bound: float) -> Tuple[int, float]:
+        """
+        Search the state space using DFS, without generating nodes with an f cost over the bound.
+        States already on the current path are skipped, so the search never loops. With the transposition
+        table, a state is also skipped if it was reached earlier in this iteration at the same or a lower g cost,
+        its subtree was then searched with at least the same cost budget.
+        When the table holds every state reached and every state cut off over the bound is one of them, the states
+        reached are all the states reachable from the start: raising the bound would not reach the target either.
+        :param start: Start position of the brick.
+        :param heuristic_costs: Heuristic costs, see compute_heuristic_costs.
+        :param bound: f cost bound of the iteration.
+        :return: Tuple of the goal node arena index (None if not found) and the lowest f cost over the bound
+            (inf if no node exceeded it, or if the target is shown unreachable).
+        """
+        self.arena = NodeArena()
+        head = self.arena.add(self.pack_state(start))
 
-        print("\nA* SEARCH COMPLETED !")
-        print("Optimal path is as below -> \n")
-        self.show_optimal_path(node)
-        return
+        # packed state ids of the nodes on the current path.
+        path_states = set()
+        path_states.add(self.arena.state[head])
+
+        # packed state id -> lowest g cost at which it was reached in this iteration, at most --tt-size states.
+        table = dict() if self.args.tt_size > 0 else None
+
+        # states cut off over the bound, kept while the table holds every state reached, for the closure test.
+        cut_states = set() if table is not None else None
+        if table is not None:
+            table[self.arena.state[head]] = 0
+
+        next_bound = inf
+        stack = list()
+        node = head
+        while True:
+            if node is not None:
+                if self.subscribers:
+                    self.emit(SearchEvent.EXPANDED, node)
+                self.stats.expanded += 1
+
+                if self.is_target_state(self.arena.state[node]):
+                    return node, next_bound
+
+                stack.append((node, self.next_valid_move(node, path_states)))
+                self.stats.frontier(len(stack))
+
+            if len(stack) == 0:
+                if cut_states is not None and all(state in table for state in cut_states):
+                    return None, inf
+                return None, next_bound
+
+            parent, moves = stack[-1]
+            next_move = next(moves, None)
+            if next_move is None:
+                # the subtree of the parent is exhausted, drop its nodes and take it off the path.
+                stack.pop()
+                path_states.discard(self.arena.state[parent])
+                self.arena.truncate(parent + 1)
+                node = None
+                continue
+
+            next_state, direction = next_move
+            g_cost = self.arena.g_cost[parent] + 1
+            f_cost = g_cost + self.min_h_cost(heuristic_costs, next_state)
+            if f_cost > bound:
+                next_bound = min(next_bound, f_cost)
+                if cut_states is not None:
+                    cut_states.add(next_state)
+                    if len(cut_states) > self.args.tt_size:
+                        cut_states = None
+                if self.subscribers:
+                    self.emit(SearchEvent.PRUNED, parent, direction=direction, f_cost=f_cost)
+                node = None
+                continue
+
+            if table is not None:
+                if next_state in table and table[next_state] <= g_cost:
+                    self.stats.rejected_visited += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.REJECTED_VISITED, parent, direction=direction)
+                    node = None
+                    continue
+                if next_state in table or len(table) < self.args.tt_size:
+                    table[next_state] = g_cost
+                else:
+                    # the table is full, states reached from now on are not all recorded.
+                    cut_states = None
+
+            path_states.add(next_state)
+            self.arena.truncate(parent + 1)
+            node = self.arena.add(next_state, parent, g_cost, direction)
+            self.stats.generated += 1
+            if self.subscribers:
+                self.emit(SearchEvent.GENERATED, node, f_cost=f_cost)
+
+    """
+    ANYTIME SEARCH SPECIFIC FUNCTIONS
+    """
+    def solve_by_ara_star(self, start: Pos, target_pos: Pos) -> int:
+        """
+        Solve the Bloxorz problem using anytime repairing A* (see search_anytime), keeping the last path found.
+        The improved solutions are kept in self.anytime_results, in the order they were found.
+        :param start: Start position of the brick.
+        :param target_pos: target position for heuristic estimates.
+        :return: Arena index of the goal node, None if no path was found within the budget.
+        """
+        self.anytime_results = list()
+        for result in self.search_anytime(start, target_pos):
+            self.anytime_results.append(result)
+            if self.render:
+                print("Solution {}: cost {}, suboptimality bound {:.2f}, found in {:.2f} ms\n".format(
+                    len(self.anytime_results), result.cost, result.bound, result.elapsed * 1000))
+
+        if len(self.anytime_results) == 0:
+            self.show_failed("ARA*")
+            return None
+
+        self.bound = self.anytime_results[-1].bound
+        node = self.replay_path(start, self.anytime_results[-1].path)
+        self.show_completed("ARA*", node, "Path" if self.bound > 1 else "Optimal path")
+        return node
+
+    def search_anytime(self, start: Pos, target_pos: Pos):
+        """
+        Anytime repairing A* (ARA*): a weighted A* search, f = g + weight * h, starting with the --weight heuristic
+        weight. Each time the search can not improve the path with the current weight, the weight is lowered by
+        WEIGHT_STEP and the search goes on, reusing the costs found so far: only the states whose cost went down
+        since they were expanded are expanded again. The search ends once the path is proven optimal, or when the
+        --time-budget (seconds, the heuristic setup excluded) or --node-budget (expanded nodes) runs out.
+        The suboptimality bound of a path is its cost over a lower bound on the optimal cost, the lowest g + h of
+        the open states; it only holds with the admissible cost methods (exact, roll, roll-axis).
+        :param start: Start position of the brick.
+        :param target_pos: target position for heuristic estimates.
+        :return: generator of SearchResult objects, one per improved solution, with the path, its suboptimality
+            bound, a copy of the search stats and the time since the search started.
+        """
+        start_time = perf_counter()
+        weight = self.args.weight
+        if weight < 1:
+            raise ValueError("Heuristic weight must be at least 1, got {}".format(weight))
+
+        self.arena = NodeArena()
+        self.cost_visited = dict()
+        head = self.arena.add(self.pack_state(start))
+        heuristic_costs = self.compute_heuristic_costs(target_pos)
+
+        # the heuristic setup, done once per world map and target, is not counted in the time budget.
+        deadline = None if self.args.time_budget is None else perf_counter() + self.args.time_budget
+        last_expansion = None if self.args.node_budget is None else self.stats.expanded + self.args.node_budget
+
+        # packed state id -> heuristic cost and arena index of the node with the lowest g cost found.
+        h_costs = {self.arena.state[head]: self.min_h_cost(heuristic_costs, self.arena.state[head])}
+        nodes = {self.arena.state[head]: head}
+        self.set_cost_visited(self.arena.state[head], 0)
+
+        # open states, states expanded with the current weight, and expanded states whose cost went down since.
+        open_states = {self.arena.state[head]}
+        closed_states = set()
+        inconsistent_states = set()
+
+        # min-heap of (f_cost, node index) tuples, entries of nodes no longer open are stale and skipped.
+        expanded_nodes = [(weight * h_costs[self.arena.state[head]], head)]
+
+        goal = head if self.is_target_state(self.arena.state[head]) else None
+        last_cost, last_bound = inf, inf
+        self.stats.frontier(1)
+        while True:
+            out_of_budget = False
+            while len(expanded_nodes) > 0:
+                f_cost, node = expanded_nodes[0]
+                state = self.arena.state[node]
+                if state not in open_states or nodes[state] != node:
+                    heappop(expanded_nodes)
+                    continue
+
+                # no open state can lead to a cheaper path with the current weight.
+                if goal is not None and self.arena.g_cost[goal] <= f_cost:
+                    break
+
+                if (deadline is not None and perf_counter() >= deadline) or \
+                        (last_expansion is not None and self.stats.expanded >= last_expansion):
+                    out_of_budget = True
+                    break
+
+                heappop(expanded_nodes)
+                open_states.remove(state)
+                closed_states.add(state)
+                if self.subscribers:
+                    self.emit(SearchEvent.EXPANDED, node, f_cost=f_cost)
+                self.stats.expanded += 1
+
+                g_cost = self.arena.g_cost[node] + 1
+                for next_state, direction in self.next_valid_move(node):
+                    if next_state in self.cost_visited and g_cost >= self.get_cost_visited(next_state):
+                        self.stats.rejected_visited += 1
+                        if self.subscribers:
+                            self.emit(SearchEvent.REJECTED_VISITED, node, direction=direction)
+                        continue
+
+                    if next_state not in h_costs:
+                        h_costs[next_state] = self.min_h_cost(heuristic_costs, next_state)
+                    if h_costs[next_state] == inf:
+                        continue
+
+                    new_node = self.arena.add(next_state, node, g_cost, direction)
+                    nodes[next_state] = new_node
+                    self.set_cost_visited(next_state, g_cost)
+                    self.stats.generated += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.GENERATED, new_node, f_cost=g_cost + weight * h_costs[next_state])
+
+                    if self.is_target_state(next_state) and (goal is None or g_cost < self.arena.g_cost[goal]):
+                        goal = new_node
+
+                    if next_state in closed_states:
+                        # expanded with a higher cost, expanded again with the next weight.
+                        self.stats.reopened += 1
+                        inconsistent_states.add(next_state)
+                    else:
+                        open_states.add(next_state)
+                        heappush(expanded_nodes, (g_cost + weight * h_costs[next_state], new_node))
+                self.stats.frontier(len(open_states))
+
+            if goal is None:
+                # the open list ran out (the target is unreachable) or the budget did.
+                return
+
+            # lower bound on the optimal cost, from the states that may still lead to a cheaper path.
+            cost = self.arena.g_cost[goal]
+            lower_bound = min((self.get_cost_visited(state) + h_costs[state]
+                               for state in open_states | inconsistent_states), default=inf)
+            bound = 1.0 if lower_bound >= cost else cost / lower_bound
+            if not out_of_budget:
+                bound = min(bound, weight)
+
+            if cost < last_cost or bound < last_bound:
+                last_cost, last_bound = cost, bound
+                stats = SearchStats.from_dict(self.stats.to_dict())
+                yield SearchResult(self.arena.path(goal), stats, perf_counter() - start_time, bound=bound)
+
+            if out_of_budget or bound <= 1:
+                return
+
+            # lower the weight, and search again from the open and inconsistent states.
+            weight = max(1.0, weight - self.WEIGHT_STEP)
+            open_states |= inconsistent_states
+            inconsistent_states = set()
+            closed_states = set()
+            expanded_nodes = [(self.get_cost_visited(state) + weight * h_costs[state], nodes[state])
+                              for state in open_states]
+            heapify(expanded_nodes)
+
+    """
+    INCREMENTAL SEARCH SPECIFIC FUNCTIONS
+    """
+    def solve_by_dstar_lite(self, start: Pos, target_pos: Pos) -> int:
+        """
+        Solve the Bloxorz problem using D* Lite, searching from the target towards the start.
+        The planner is kept in self.planner: after changing tiles with planner.set_tiles (and moving the start with
+        planner.move_start), planner.plan() repairs the previous search instead of starting over.
+        :param start: Start position of the brick.
+        :param target_pos: target position.
+        :return: Arena index of the goal node, None if the target is unreachable.
+        """
+        self.planner = DStarLite(self, start, target_pos)
+        result = self.planner.plan()
+        self.stats = result.stats
+        if result.path is None:
+            self.show_failed("D* LITE")
+            return None
+
+        node = self.replay_path(start, result.path)
+        self.show_completed("D* LITE", node)
+        return node
 
     """
     Greedy Best First Search
     """
-    def solve_by_greedy_best_first(self, head: TreeNode, target_pos: Pos):
+    def solve_by_greedy_best_first(self, start: Pos, target_pos: Pos) -> int:
         """
-        Solve the Bloxorz problem using A* algorithm.
-        :param head: head node.
+        Solve the Bloxorz problem using greedy best first algorithm.
+        Every state is added to the open list once, the first time it is generated. Ties on the heuristic cost
+        are broken by the lower g cost, then by the insertion order, so the search is deterministic.
+        :param start: Start position of the brick.
         :param target_pos: target position for heuristic estimates.
+        :return: Arena index of the goal node, None if the target is unreachable.
         """
+        self.arena = NodeArena()
+        head = self.arena.add(self.pack_state(start))
 
         # compute the heuristic cost from all valid positions to the target positions
         heuristic_costs = self.compute_heuristic_costs(target_pos)
-        head.f_cost = self.min_h_cost(heuristic_costs, head)
-        self.set_cost_visited(head.brick.pos, 0)
 
+        # packed state ids of the states generated so far, the open list holds each of them at most once.
+        visited_states = set()
+        visited_states.add(self.arena.state[head])
+
+        # min-heap of (h_cost, g_cost, node index) tuples, node indices grow with the insertion order.
         expanded_nodes = list()
+        heappush(expanded_nodes, (self.min_h_cost(heuristic_costs, self.arena.state[head]), 0, head))
 
-        steps = 0
-        node = head
+        self.stats.frontier(1)
+        while len(expanded_nodes) > 0:
+            self.stats.frontier(len(expanded_nodes))
+            f_cost, g_cost, node = heappop(expanded_nodes)
+            if self.subscribers:
+                self.emit(SearchEvent.EXPANDED, node, f_cost=f_cost)
+            self.stats.expanded += 1
 
-        print("Step: {}, Depth: {}, Cost: {} - {}".format(
-                steps, self.get_node_depth(head), self.get_cost_visited(head.brick.pos), str(head)))
-        self.show(head.brick)
+            # if goal state is dequeued (with any bridge mask), mark the search as completed.
+            if self.is_target_state(self.arena.state[node]):
+                self.show_completed("Greedy Best First", node, "Path")
+                return node
 
-        while True:
-            for next_pos, direction in self.next_valid_move(node, []):
+            for next_state, direction in self.next_valid_move(node, visited_states):
 
-                # new node and estimated cost.
-                new_node = TreeNode(Brick(next_pos))
-                h_cost = self.min_h_cost(heuristic_costs, new_node)
+                # new node and estimated cost, linked to the current node.
+                new_node = self.arena.add(next_state, node, g_cost + 1, direction)
+                h_cost = self.min_h_cost(heuristic_costs, next_state)
 
-                new_node.f_cost = h_cost
-                # set current node's child pointer.
-                setattr(node, direction.name.lower(), new_node)     # node.{left|right|up|down} -> new_node
+                visited_states.add(next_state)
+                heappush(expanded_nodes, (h_cost, g_cost + 1, new_node))
+                self.stats.generated += 1
+                if self.subscribers:
+                    self.emit(SearchEvent.GENERATED, new_node, f_cost=h_cost)
 
-                # link new_node to the current node.
-                new_node.parent = node
-                new_node.dir_from_parent = direction
-                heappush(expanded_nodes, new_node)
-                self.debug("{:10s}: {:21s} - {} [f_cost: {:.2f}] ".format(
-                    "added", "new", str(new_node), new_node.f_cost))
+        self.show_failed("Greedy Best First")
+        return None
 
-            node = heappop(expanded_nodes)
-            self.debug("{:10s}: {:21s} - {}".format("removed", "frontier node", str(node)))
-
-            # update cost of this node
-            self.set_cost_visited(node.brick.pos,  self.get_cost_visited(node.parent.brick.pos) + 1)
+    """
+    Beam Search
+    """
+    def solve_by_beam(self, start: Pos, target_pos: Pos) -> int:
+        """
+        Solve the Bloxorz problem using beam search, a breadth first search keeping only the --beam-width nodes
+        with the lowest heuristic cost at each depth. The frontier never holds more than beam width nodes, so the
+        memory and the time per depth are bounded, at the cost of optimality and completeness: the path found may
+        not be the shortest one, and the target may be missed if every node leading to it was pruned.
+        :param start: Start position of the brick.
+        :param target_pos: target position for heuristic estimates.
+        :return: Arena index of the goal node, None if the beam runs out of nodes.
+        """
+        beam_width = self.args.beam_width
+        if beam_width < 1:
+            raise ValueError("Beam width must be at least 1, got {}".format(beam_width))
 
-            steps += 1
-            print("Step: {}, Depth: {}, Cost: {} - {} [f_cost: {:.2f}]".format(
-                steps, self.get_node_depth(node), self.get_cost_visited(node.brick.pos), str(node), node.f_cost))
-            self.show(node.brick)
+        self.arena = NodeArena()
+        head = self.arena.add(self.pack_state(start))
 
-            # if goal state is dequeued, mark the search as completed.
-            if node.brick.pos == target_pos:
-                break
+        # compute the heuristic cost from all valid positions to the target positions
+        heuristic_costs = self.compute_heuristic_costs(target_pos)
 
-        print("\nGreedy Best First SEARCH COMPLETED !")
-        return
+        # packed state ids of the states kept in a beam, a state is never kept at two depths.
+        visited_states = set()
+        visited_states.add(self.arena.state[head])
+
+        layer = [head]
+        self.stats.frontier(1)
+        while len(layer) > 0:
+            # (h_cost, node index) of the successors of all the nodes of the current depth.
+            candidates = list()
+            for node in layer:
+                if self.subscribers:
+                    self.emit(SearchEvent.EXPANDED, node)
+                self.stats.expanded += 1
+
+                if self.is_target_state(self.arena.state[node]):
+                    self.show_completed("Beam", node, "Path")
+                    return node
+
+                for next_state, direction in self.next_valid_move(node, visited_states):
+                    new_node = self.arena.add(next_state, node, self.arena.g_cost[node] + 1, direction)
+                    visited_states.add(next_state)
+                    candidates.append((self.min_h_cost(heuristic_costs, next_state), new_node))
+                    self.stats.generated += 1
+                    if self.subscribers:
+                        self.emit(SearchEvent.GENERATED, new_node, f_cost=candidates[-1][0])
+
+            # ties are broken by the node index, i.e. the generation order.
+            layer = [node for _, node in nsmallest(beam_width, candidates)]
+            self.stats.frontier(len(layer))
+
+            # states pruned from the beam may be reached again from a later depth.
+            kept = set(layer)
+            for h_cost, node in candidates:
+                if node not in kept:
+                    visited_states.discard(self.arena.state[node])
+                    if self.subscribers:
+                        self.emit(SearchEvent.PRUNED, node, f_cost=h_cost)
+
+        self.show_failed("Beam")
+        return None
 
     """
     UTILITY FUNCTIONS
     """
 
+    def subscribe(self, subscriber):
+        """
+        Add a subscriber to the search events.
+        Searches check for subscribers before building an event, runs without any pay almost nothing per node.
+        :param subscriber: callable(event, blox, node, arena, direction, f_cost), see events.ConsoleSubscriber.
+        """
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        """
+        Remove a subscriber added with subscribe.
+        :param subscriber: The subscriber.
+        """
+        self.subscribers.remove(subscriber)
+
+    def emit(self, event: SearchEvent, node: int, arena: NodeArena = None, direction: Direction = None,
+             f_cost: float = None):
+        """
+        Send a search event to all the subscribers.
+        :param event: SearchEvent enumeration.
+        :param node: Arena index of the node.
+        :param arena: Arena holding the node, defaults to the arena of the current search.
+        :param direction: Direction of the move from the node, for the rejected and pruned moves.
+        :param f_cost: f cost of the node, for the heuristic searches.
+        """
+        arena = self.arena if arena is None else arena
+        for subscriber in self.subscribers:
+            subscriber(event, self, node, arena, direction, f_cost)
+
     def debug(self, message: str):
         """
         Print the given message if verbose mode is ON.
@@ -404,145 +1342,295 @@ class Bloxorz:
         if self.args.verbose:
             print(message)
 
-    def get_cost_visited(self, pos: Pos) -> int:
+    def pack_state(self, pos: Pos, mask: int = None) -> int:
         """
-        cost from the visited positions list.
+        Pack a position (x, y coordinates + brick orientation) and a bridge mask into a single integer state id.
+        The position is expected to be on the world map (see is_off_map).
         :param pos: Position
+        :param mask: Bridge mask, bits of the open bridges. Defaults to the bridges open at the start of the level.
+        :return: state id, unique for each x, y, orientation and bridge mask on the world map.
+        """
+        if mask is None:
+            mask = self.level.initial_mask
+        return mask * self.num_tile_states + (pos.y * self.width + pos.x) * 3 + pos.orientation.value - 1
+
+    def unpack_state(self, state: int) -> Pos:
+        """
+        Unpack the position of a state id created with pack_state.
+        :param state: packed state id.
+        :return: Position object with x, y coordinates and brick orientation.
+        """
+        tile, orientation = divmod(state % self.num_tile_states, 3)
+        y, x = divmod(tile, self.width)
+        return Pos(x, y, Orientation(orientation + 1))
+
+    def state_mask(self, state: int) -> int:
+        """
+        :param state: packed state id.
+        :return: Bridge mask of a state id created with pack_state.
+        """
+        return state // self.num_tile_states
+
+    def get_cost_visited(self, state: int) -> int:
+        """
+        cost from the visited positions list.
+        :param state: packed state id.
         :return: The actual cost to reach a node.
         """
-        cost = namedtuple("cost", ['x', 'y', 'orientation'])
-        index = cost(x=pos.x, y=pos.y, orientation=pos.orientation)
-        return self.cost_visited[index]
+        return self.cost_visited[state]
 
-    def set_cost_visited(self, pos: Pos, value: int):
+    def set_cost_visited(self, state: int, value: int):
         """
         cost from the visited positions list.
-        :param pos: Position
+        :param state: packed state id.
         :return: The actual cost to reach a node.
         """
-        cost = namedtuple("cost", ['x', 'y', 'orientation'])
-        index = cost(x=pos.x, y=pos.y, orientation=pos.orientation)
-        self.cost_visited[index] = value
+        self.cost_visited[state] = value
 
 
-    def is_off_map(self, pos: Pos) -> bool:
+    def set_tile(self, x: int, y: int, value: int):
+        """
+        Change a tile of the world map, for maps with vanishing or appearing tiles, see set_tiles.
+        :param x: x coordinate of the tile (0 based index).
+        :param y: y coordinate of the tile (0 based index).
+        :param value: New tile value, Level.HOLE, Level.TILE or Level.TARGET.
+        """
+        self.set_tiles([(x, y, value)])
+
+    def set_tiles(self, tiles: List[Tuple[int, int, int]]):
+        """
+        Change tiles of the world map, for maps with vanishing or appearing tiles.
+        The grid is copied on the first change, the level (and its file, if memory mapped) is left untouched.
+        The heuristic costs of the old map are dropped, the transition table is built again if it was precomputed.
+        :param tiles: List of (x, y, tile value) tuples.
+        """
+        if self.grid is self.level.grid:
+            self.grid = bytearray(self.level.grid)
+        for x, y, value in tiles:
+            self.grid[y * self.width + x] = value
+        self.renderer = None
+        self.heuristic_costs = dict()
+
+        self.transitions = None
+        if self.args.precompute:
+            self.build_transitions()
+
+    def is_off_map(self, pos: Pos, mask: int = -1) -> bool:
         """
         Checks if the given position (x, y coordinates + brick orientation) leads the
         brick to fall off the world map.
         :param pos: Position object containing x, y coordinates and brick orientation.
+        :param mask: Bridge mask, bits of the open bridges. Defaults to all the bridges open.
         :return: True, if the brick will fall off the map, False otherwise.
         """
 
         for x, y in Brick(pos).get_blocks_occupied():
 
-            # bad coordinates, outside the matrix.
-            if x < 0 or y < 0 or x >= len(self.world[0]) or y >= len(self.world):
+            # bad coordinates, outside the grid.
+            if x < 0 or y < 0 or x >= self.width or y >= self.height:
                 return True
 
             # no-tile positions
-            if self.world[y][x] == 0:
+            tile = self.grid[y * self.width + x]
+            if tile == Level.HOLE:
+                return True
+
+            # closed bridges
+            if tile == Level.BRIDGE and not (mask >> self.level.bridges[y * self.width + x]) & 1:
                 return True
 
         return False
 
-    def is_target_state(self, pos: Pos) -> bool:
+    def is_target_state(self, state: int) -> bool:
         """
-        Check if the given position is the target state.
-        :param pos: Position object.
+        Check if the given state is the target state of the search, the brick standing on the target position
+        given to solve, with any bridge mask.
+        :param state: packed state id.
         :return: True if the position/orientation matches the target state, False otherwise.
         """
-        if pos.orientation is Orientation.STANDING and self.world[pos.y][pos.x] == 9:
-            return True
-        return False
+        return state % self.num_tile_states == self.target_state
 
-    def get_node_depth(self, node: TreeNode) -> int:
+    def get_node_depth(self, node: int, arena: NodeArena = None) -> int:
         """
-        Compute the depth of a given tree node.
-        :param node: Tree node.
+        Depth of a given tree node.
+        :param node: Arena index of the node.
+        :param arena: Arena holding the node, defaults to the arena of the last search.
         :return: Depth value as distance of the node from the root node.
         """
-        level = 0
-        tmpnode = node
-        while tmpnode.parent is not None:
-            level += 1
-            tmpnode = tmpnode.parent
-        return level
+        arena = self.arena if arena is None else arena
+        return arena.depth[node]
+
+    def get_brick(self, node: int, arena: NodeArena = None) -> Brick:
+        """
+        Brick placed at the position of a given tree node, for display.
+        :param node: Arena index of the node.
+        :param arena: Arena holding the node, defaults to the arena of the last search.
+        :return: Brick object.
+        """
+        arena = self.arena if arena is None else arena
+        return Brick(self.unpack_state(arena.state[node]))
 
-    def next_valid_move(self, node: TreeNode, visited_pos: List):
+    def node_str(self, node: int, arena: NodeArena = None) -> str:
+        """
+        String representation of a tree node (for easier debugging)
+        :param node: Arena index of the node.
+        :param arena: Arena holding the node, defaults to the arena of the last search.
+        :return: Formatted string of the node attributes values.
+        """
+        arena = self.arena if arena is None else arena
+        direction = arena.get_direction(node)
+        dir_name = direction.name.lower() if direction else "none"
+        parent = arena.parent[node]
+        pos = self.unpack_state(arena.state[node])
+
+        node_string = '[Node: {}, Parent: {}, Parent->{:5s}, row: {}, col: {}'.format(
+            node, parent if parent != NodeArena.NO_PARENT else "none", dir_name, pos.y + 1, pos.x + 1)
+        if not self.level.is_static():
+            node_string += ', bridges: {:b}'.format(self.state_mask(arena.state[node]))
+        return node_string + ']'
+
+    def next_valid_move(self, node: int, visited_states: Set[int] = None, arena: NodeArena = None):
         """
         get next valid move.
-        :param node: Node object.
-        :param visited_pos: Visited positions list.
-        :return:
+        Moves are looked up in the transition table if one was precomputed, derived from the world map otherwise.
+        :param node: Arena index of the node.
+        :param visited_states: Set of packed state ids already visited, None to skip the visited check.
+        :param arena: Arena holding the node, defaults to the arena of the current search.
+        :return: generator of (next state id, direction) tuples.
+        """
+        arena = self.arena if arena is None else arena
+        if self.transitions is not None:
+            moves = self.transitions.successors(arena.state[node])
+        else:
+            moves = self.derive_moves(arena.state[node], node, arena, count=True)
+
+        for next_state, direction in moves:
+            # visited or valid ?
+            if visited_states is not None and next_state in visited_states:
+                self.stats.rejected_visited += 1
+                if self.subscribers:
+                    self.emit(SearchEvent.REJECTED_VISITED, node, arena, direction)
+            else:
+                yield next_state, direction
+
+    def derive_moves(self, state: int, node: int = None, arena: NodeArena = None, count: bool = False):
         """
+        Derive the moves from a state that keep the brick on the world map.
+        Switches pressed by the brick on landing change the bridge mask of the next state.
+        :param state: packed state id.
+        :param node: Arena index of the node at the state, for the search events.
+        :param arena: Arena holding the node, defaults to the arena of the current search.
+        :param count: Count the moves off the map in the search statistics, only for the expansions of a search.
+        :return: generator of (next state id, direction) tuples.
+        """
+        mask = self.state_mask(state)
+        brick = Brick(self.unpack_state(state))
         for direction in Direction.get_directions(self.args.order):
             # find next position in the given direction
-            next_pos = node.brick.next_pos(direction)
-
-            # invalid, visited or valid ?
-            if self.is_off_map(next_pos):
-                self.debug("{:10s}: {:21s} - [hash(Parent): {}, Parent->{:5s}]".format(
-                    "rejected", "invalid move", hash(node), direction.name.lower()))
-            elif next_pos in visited_pos:
-                self.debug("{:10s}: {:21s} - [hash(Parent): {}, Parent->{:5s}]".format(
-                    "rejected", "visited node", hash(node), direction.name.lower()))
+            next_pos = brick.next_pos(direction)
+
+            next_mask = mask
+            off_map = self.is_off_map(next_pos, mask)
+            if not off_map and len(self.level.switches) > 0:
+                set_mask, clear_mask, toggle_mask = self.level.switch_effect(
+                    Brick(next_pos).get_blocks_occupied(), next_pos.orientation is Orientation.STANDING)
+                next_mask = ((mask | set_mask) & ~clear_mask) ^ toggle_mask
+
+                # the brick falls if a bridge under it is closed by the switches.
+                off_map = next_mask != mask and self.is_off_map(next_pos, next_mask)
+
+            if off_map:
+                if count:
+                    self.stats.rejected_off_map += 1
+                if node is not None and self.subscribers:
+                    self.emit(SearchEvent.REJECTED_OFF_MAP, node, arena, direction)
             else:
-                yield next_pos, direction
+                yield self.pack_state(next_pos, next_mask), direction
+
+    def successors(self, state: int):
+        """
+        Moves from a state that keep the brick on the world map, from the transition table if one was precomputed.
+        :param state: packed state id.
+        :return: generator of (next state id, direction) tuples.
+        """
+        if self.transitions is not None:
+            return self.transitions.successors(state)
+        return self.derive_moves(state)
 
-    def show_optimal_path(self, node: TreeNode):
+    def replay_path(self, start: Pos, moves: List[Direction]) -> int:
+        """
+        Build the search tree branch for a list of moves in a new arena.
+        Used by the searches that do not keep a node per state.
+        :param start: Start position of the brick.
+        :param moves: List of moves from the start position.
+        :return: Arena index of the last node of the branch.
+        """
+        self.arena = NodeArena()
+        node = self.arena.add(self.pack_state(start))
+        for direction in moves:
+            next_state = next(state for state, move in self.successors(self.arena.state[node]) if move is direction)
+            node = self.arena.add(next_state, node, self.arena.g_cost[node] + 1, direction)
+        return node
+
+    def show_completed(self, search_name: str, node: int, path_name: str = "Optimal path"):
+        """
+        Display the completion of a search and the path found, unless rendering is off.
+        :param search_name: Name of the search algorithm.
+        :param node: Arena index of the goal node.
+        :param path_name: Name of the path in the message, None to display no path.
+        """
+        if not self.render:
+            return
+        if self.args.animate:
+            # the last frames may have been dropped for the frame rate, the final state is always shown.
+            self.show(self.get_brick(node), "Goal, Depth: {}, Cost: {} - {}".format(
+                self.arena.depth[node], self.arena.g_cost[node], self.node_str(node)), True)
+        print("\n{} SEARCH COMPLETED !".format(search_name))
+        if path_name is not None:
+            print("{} is as below -> \n".format(path_name))
+            self.show_optimal_path(node)
+
+    def show_failed(self, search_name: str):
+        """
+        Display the failure of a search to find a path, unless rendering is off.
+        :param search_name: Name of the search algorithm.
+        """
+        if self.render:
+            print("\n{} SEARCH FAILED, NO PATH FOUND !".format(search_name))
+
+    def show_optimal_path(self, node: int):
         """
         Given a leaf node, traverse up to the root node, and display the path leading up to the leaf node.
-        :param node: Leaf node.
-        """
-        node_stack = list()
-        while node is not None:
-            node_stack.append(node)
-            node = node.parent
-
-        # pop and print the list items
-        while len(node_stack) > 0:
-            node = node_stack.pop()
-            if node.dir_from_parent is None:
-                print("[START] ", end="")
-            else:
-                print("-> {} ".format(node.dir_from_parent.name.lower()), end="")
+        :param node: Arena index of the leaf node.
+        """
+        print("[START] ", end="")
+        for direction in self.arena.path(node):
+            print("-> {} ".format(direction.name.lower()), end="")
         print("[GOAL]\n\n")
 
-    def show(self, brick: Brick):
+    def get_renderer(self) -> MapRenderer:
+        """
+        World map display, built on the first call (see renderer.py) and dropped when a tile changes.
+        :return: MapRenderer object.
+        """
+        if self.renderer is None:
+            self.renderer = MapRenderer(self.grid, self.width, self.height, self.args.style, self.args.animate,
+                                        self.args.fps)
+        return self.renderer
+
+    def show(self, brick: Brick, header: str = None, force: bool = False):
         """
         Display the world map and brick position.
         Defaults style is displaying the world map using unicode characters,
         this may not work on old terminal emulators lacking utf-8 support.
         Specify program arguments to use --style=ascii on such terminals.
         :param brick: Brick object.
+        :param header: Line displayed above the world map, None for no line.
+        :param force: Display the map even over the --fps frame rate of --animate.
         """
-        if self.args.style == "unicode":
-            style = dict({
-                "tile": "⬜",
-                "hole": "⬛",
-                "brick": "🟧",
-                "target": "❎"
-            })
-        else:
-            style = dict({
-                "tile": "1",
-                "hole": "0",
-                "brick": "X",
-                "target": "+"
-            })
-
-        for y in range(len(self.world)):
-            for x in range(len(self.world[0])):
-                if [x, y] in brick.get_blocks_occupied():
-                    print(style['brick'], end="")
-                elif self.world[y][x] == 9:
-                    print(style['target'], end="")
-                else:
-                    tile_char = style['tile'] if self.world[y][x] == 1 else style['hole']
-                    print(tile_char, end="")
-
-            print("")
-        print("")
+        start_time = perf_counter()
+        self.get_renderer().draw(brick.get_blocks_occupied(), header, force)
+        self.stats.render_time += perf_counter() - start_time
 
     def show_args(self):
         """
@@ -550,22 +1638,27 @@ class Bloxorz:
         :return:
         """
         self.debug("cost-method: {}".format(self.args.cost_method))
+        self.debug("cache-dir: {}".format(self.args.cache_dir))
+        self.debug("depth-limit: {}".format(self.args.depth_limit))
+        self.debug("level: {}".format(self.args.level))
         self.debug("order: {}".format(self.args.order))
+        self.debug("precompute: {}".format(self.args.precompute))
+        self.debug("profile: {}".format(self.args.profile))
+        self.debug("quiet: {}".format(self.args.quiet))
         self.debug("search: {}".format(self.args.search))
+        self.debug("solution-cache: {}".format(self.args.solution_cache))
+        self.debug("stats: {}".format(self.args.stats))
         self.debug("style: {}".format(self.args.style))
         self.debug("verbose: {}\n".format(self.args.verbose))
 
 
-def get_target_position(world: List[List[int]]) -> Tuple:
+def get_target_position(level: Level) -> Tuple:
     """
     Utility function to find the target block.
-    :param world: m*n matrix.
+    :param level: Level object.
     :return: A tuple containing x,y coordinates of the target block.
     """
-    for y in range(len(world)):
-        for x in range(len(world[0])):
-            if world[y][x] == 9:
-                return x, y
+    return level.target
 
 
 def validate_search_order(search_order):
@@ -582,26 +1675,166 @@ def validate_search_order(search_order):
         "Bad search order '{}'. Must be a permutation of the characters 'L', 'R', 'U', 'D'".format(search_order))
 
 
+def validate_list(choices: list):
+    """
+    Argument type for a comma separated list of choices.
+    :param choices: Allowed values.
+    :return: function parsing the argument value into a list.
+    """
+    def parse(value: str) -> list:
+        values = value.split(',')
+        for item in values:
+            if item not in choices:
+                raise argparse.ArgumentTypeError("Bad value '{}'. Must be one of {}".format(item, ', '.join(choices)))
+        return values
+    return parse
+
+
+def level_files(paths: list) -> list:
+    """
+    List the level files of a corpus.
+    :param paths: Level files and directories of level files.
+    :return: Sorted list of level file paths.
+    """
+    files = list()
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path)) if not name.startswith('.')]
+        else:
+            files.append(path)
+    return files
+
+
+def load_level(path):
+    """
+    Load a level file, if specified in cli arguments.
+    :param path: Text or binary level file path.
+    :return: Level object, raise exception if the file can not be read or is not a valid level.
+    """
+    try:
+        return Level.load(path)
+    except (OSError, ValueError) as e:
+        raise argparse.ArgumentTypeError("Bad level file '{}': {}".format(path, e))
+
+
 epilog = """
 Search order can be any permutation of the characters 'L', 'R', 'U', 'D'.
 Some of the search algorithms (e.g. DFS) may work better with knowing the general direction of the target block. 
 """
 parser = argparse.ArgumentParser(                                                                               # noqa
     description='Bloxorz python implementation.', epilog=epilog, formatter_class=argparse.RawDescriptionHelpFormatter)
-parser.add_argument('-c', '--cost-method', choices=['euclidean', 'manhattan'], default='euclidean',
+parser.add_argument('--animate', action='store_true',
+                    help='Draw the search steps in place with ANSI escape codes, at most --fps frames per second.')
+parser.add_argument('-b', '--beam-width', type=int, default=64,
+                    help='Number of nodes kept at each depth of the beam search. (default=64)')
+parser.add_argument('-c', '--cost-method', choices=COST_METHODS, default='euclidean',
                     help='Distance metrics for heuristic cost for A*. (default=euclidean)')
+parser.add_argument('--cache-dir', default=os.path.join(os.path.expanduser('~'), '.cache', 'bloxorz'),
+                    help='Directory of the exact heuristic cost tables. (default=~/.cache/bloxorz)')
+parser.add_argument('-d', '--depth-limit', type=int, default=None,
+                    help='Maximum search depth for DFS and IDDFS. (default=unbounded)')
+parser.add_argument('--fps', type=float, default=30,
+                    help='Maximum frame rate of --animate, the steps in between are not drawn. 0 for no limit. '
+                         '(default=30)')
+parser.add_argument('-l', '--level', type=load_level, default=None,
+                    help='Level file, in text or binary format. (default=built-in first level)')
+parser.add_argument('--node-budget', type=int, default=None,
+                    help='Maximum number of nodes expanded by the ARA* search, the best path found is kept. '
+                         '(default=unbounded)')
 parser.add_argument('-o', '--order', default='LRUD', type=validate_search_order,
                     help='Order of search directions. (default=LRUD)')
-parser.add_argument('-s', '--search', choices=['bfs', 'dfs', 'ucs', 'greedy_bfs', 'a-star'], default='a-star',
+parser.add_argument('--open-list', choices=OPEN_LIST_TYPES, default='heap',
+                    help='Open list of the UCS and A* searches, a binary heap or a bucket queue for integer costs '
+                         '(UCS, and A* with the manhattan, exact and rolling cost methods). (default=heap)')
+parser.add_argument('-p', '--precompute', action='store_true',
+                    help='Precompute the state transition table of the world map before searching.')
+parser.add_argument('--profile', choices=['cprofile', 'tracemalloc'], default=None,
+                    help='Profile the search, report the functions taking the most time (cprofile) or the lines '
+                         'allocating the most memory (tracemalloc) to stderr. (default=off)')
+parser.add_argument('-q', '--quiet', action='store_true',
+                    help='Headless mode, show the final path only, without the search steps.')
+parser.add_argument('--solution-cache', action='store_true',
+                    help='Reuse the results of earlier searches with the same level, positions and configuration, '
+                         'stored in the cache directory.')
+parser.add_argument('-s', '--search', choices=SEARCHES, default='a-star',
                     help='Search method. (default=a-star)')
+parser.add_argument('--stats', default=None,
+                    help='Write the search stats to the given JSON file. (default=off)')
+parser.add_argument('--time-budget', type=float, default=None,
+                    help='Time limit of the ARA* search in seconds, the best path found is kept. (default=unbounded)')
+parser.add_argument('--tt-size', type=int, default=65536,
+                    help='Maximum number of states in the transposition table of IDA*, 0 for no table. '
+                         '(default=65536)')
 parser.add_argument('-t', '--style', choices=['ascii', 'unicode'], default='unicode',
                     help='World map display style. (default=unicode)')
 parser.add_argument('-v', '--verbose', action='store_true', help='verbose output.')
+parser.add_argument('-w', '--weight', type=float, default=3.0,
+                    help='Initial heuristic weight of the ARA* search. (default=3.0)')
+
+
+def solve(grid, start: Tuple[int, int] = None, target: Tuple[int, int] = None, algorithm: str = 'a-star',
+          order: str = 'LRUD', heuristic: str = 'euclidean', **options) -> SearchResult:
+    """
+    Library entry point, solve a level without any output.
+    The search arguments not given are the defaults of the command line arguments.
+    :param grid: Level object, or matrix of tile values (see Level.from_matrix).
+    :param start: x, y coordinates of the start tile (0 based index), defaults to the start tile of a Level object.
+    :param target: x, y coordinates of the target tile, defaults to the target tile of the level.
+    :param algorithm: Search method, one of the --search choices.
+    :param order: Order of search directions, a permutation of 'L', 'R', 'U', 'D'.
+    :param heuristic: Cost method of the heuristic searches, one of the --cost-method choices.
+    :param options: Other search arguments by name, e.g. depth_limit=10, beam_width=16, precompute=True.
+    :return: SearchResult. Raises ValueError for bad arguments or a search not supported on the level.
+    """
+    args = parser.parse_args(['--quiet'])
+    for name, value in options.items():
+        if name not in vars(args) or name in ('level', 'quiet', 'verbose', 'profile', 'stats'):
+            raise TypeError("solve() got an unexpected keyword argument '{}'".format(name))
+        setattr(args, name, value)
+    args.search, args.cost_method = algorithm, heuristic
+
+    for name, choices in ARGUMENT_CHOICES.items():
+        value = getattr(args, name)
+        if value not in choices:
+            raise ValueError("Bad {} '{}'. Must be one of {}".format(name, value, ', '.join(choices)))
+    try:
+        args.order = validate_search_order(order)
+    except argparse.ArgumentTypeError as e:
+        raise ValueError(str(e))
+
+    if isinstance(grid, Level):
+        level = grid
+    elif start is None:
+        raise ValueError("The start position is required with a matrix of tile values")
+    else:
+        level = Level.from_matrix(grid, tuple(start))
+    blox = Bloxorz(level, args)
 
-app_args = parser.parse_args()
+    start = start or level.start
+    target = target or level.target
+    start_pos = Pos(start[0], start[1], Orientation.STANDING)
+    target_pos = Pos(target[0], target[1], Orientation.STANDING)
+    for name, pos in (("start", start_pos), ("target", target_pos)):
+        if blox.is_off_map(pos):
+            raise ValueError("The {} position {}, {} is not on a tile".format(name, pos.x, pos.y))
+    return blox.solve(start_pos, target_pos)
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        # batch mode, solve many levels and configurations in a process pool.
+        from batch import main
+        main(sys.argv[2:])
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        # server mode, answer solve requests on a unix domain socket.
+        from serve import main
+        main(sys.argv[2:])
+        sys.exit(0)
+
+    app_args = parser.parse_args()
+
     matrix = [
         [1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
         [1, 1, 1, 1, 1, 1, 0, 0, 0, 0],
@@ -611,26 +1844,34 @@ if __name__ == '__main__':
         [0, 0, 0, 0, 0, 0, 1, 1, 1, 0]
     ]
 
-    blox = Bloxorz(matrix, app_args)
-
     (start_x, start_y) = (2, 2)
 
-    # initialize the brick to (0 based index) x,y coordinates and a standing orientation.
-    start_pos = Pos(start_x-1, start_y-1, Orientation.STANDING)
-    brick_obj = Brick(start_pos)
-    root_node = TreeNode(brick_obj)
-
-    if app_args.search == 'bfs':
-        blox.solve_by_bfs(root_node)
-    elif app_args.search == 'dfs':
-        blox.solve_by_dfs(root_node)
-    elif app_args.search == 'ucs':
-        blox.solve_by_ucs(root_node)
-    elif app_args.search == 'greedy_bfs':
-        x_pos, y_pos = get_target_position(matrix)
-        blox.solve_by_greedy_best_first(root_node, Pos(x_pos, y_pos, Orientation.STANDING))
-    elif app_args.search == 'a-star':
-        x_pos, y_pos = get_target_position(matrix)
-        blox.solve_by_astar(root_node, Pos(x_pos, y_pos, Orientation.STANDING))
-    else:
-        print("NO SUCH SEARCH ALGORITHM KNOWN '{}'".format(app_args.search))
+    # built-in level, with the start at (0 based index) x,y coordinates.
+    level = app_args.level or Level.from_matrix(matrix, (start_x-1, start_y-1))
+    blox = Bloxorz(level, app_args)
+
+    # initialize the brick to the start tile and a standing orientation.
+    start_pos = Pos(level.start[0], level.start[1], Orientation.STANDING)
+
+    x_pos, y_pos = get_target_position(level)
+    try:
+        if app_args.profile:
+            result = run_profiled(app_args.profile, blox.solve, start_pos, Pos(x_pos, y_pos, Orientation.STANDING))
+        else:
+            result = blox.solve(start_pos, Pos(x_pos, y_pos, Orientation.STANDING))
+    except ValueError as e:
+        # search or cost method not supported on the level.
+        parser.error(str(e))
+
+    if app_args.stats:
+        with open(app_args.stats, 'w') as stats_file:
+            json.dump(dict({
+                "search": app_args.search,
+                "order": app_args.order,
+                "cost_method": app_args.cost_method,
+                "precompute_time": blox.precompute_time
+            }, **result.to_dict()), stats_file, indent=2)
+
+    # in headless mode, only the final path is shown.
+    if app_args.quiet:
+        print(result)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Tuple
 from direction import Direction
 from orientation import Orientation
 from pos import Pos
@@ -89,3 +89,12 @@ class Brick:
         # occupies 2 blocks along x axis in horizontal pos.
         if self.pos.orientation is Orientation.HORIZONTAL_LYING:
             return [[self.pos.x, self.pos.y], [self.pos.x + 1, self.pos.y]]
+
+    def get_doubled_center(self) -> Tuple[int, int]:
+        """
+        Find the center of the brick, with coordinates doubled to keep them integers.
+        A roll moves the doubled center by 2 or 3 along the direction of the roll.
+        :return: A tuple containing the doubled x, y coordinates of the brick center.
+        """
+        blocks = self.get_blocks_occupied()
+        return blocks[0][0] + blocks[-1][0] + 1, blocks[0][1] + blocks[-1][1] + 1
@@ -27,3 +27,16 @@ class Direction(Enum):
             directions.append(char_map[char])
 
         return directions
+
+    def opposite(self) -> Direction:
+        """
+        Direction undoing a move in this direction, every roll of the brick can be reversed.
+        :return: Opposite direction enumeration.
+        """
+        opposites = {
+            Direction.UP: Direction.DOWN,
+            Direction.DOWN: Direction.UP,
+            Direction.LEFT: Direction.RIGHT,
+            Direction.RIGHT: Direction.LEFT
+        }
+        return opposites[self]
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import mmap
+import struct
+import sys
+from array import array
+from typing import List
+
+from brick import Brick
+from direction import Direction
+from heuristic_db import build_distances, UNREACHABLE
+from orientation import Orientation
+from pos import Pos
+
+
+class DistanceMap:
+    """
+    Optimal distances and moves from every state of a world map to the target, from a single BFS grown from
+    the target. Per state, the table holds the number of moves to the target and the first move of an optimal path,
+    so the path from any start is read in O(path length) without searching.
+
+    Tables are exported in a binary file: a fixed size header (magic, version, width, height, target state id,
+    number of states, all little endian), then one int32 distance per state id (UNREACHABLE = -1) and one int8
+    Direction value per state id (0 for the target and the unreachable states). State ids are packed as
+    (y * width + x) * 3 + orientation - 1, see Bloxorz.pack_state.
+    """
+
+    MAGIC = b'BLXD'
+    VERSION = 1
+
+    # magic, version, width, height, target state id, number of states.
+    HEADER = struct.Struct('<4sIIIII')
+
+    def __init__(self, width: int, height: int, target_state: int, distances, next_moves):
+        """
+        :param width: Number of columns of the world map.
+        :param height: Number of rows of the world map.
+        :param target_state: Packed state id of the target.
+        :param distances: int32 sequence of distances indexed by state id.
+        :param next_moves: int8 sequence of Direction values indexed by state id.
+        """
+        self.width = width
+        self.height = height
+        self.target_state = target_state
+        self.distances = distances
+        self.next_moves = next_moves
+
+    @classmethod
+    def build(cls, blox, target_pos: Pos):
+        """
+        Build the table of a world map with a BFS from the target.
+        :param blox: Bloxorz object providing the world map and the moves.
+        :param target_pos: Target position of the brick.
+        :return: DistanceMap object.
+        """
+        next_moves = array('b', [0]) * (blox.height * blox.width * 3)
+        distances = build_distances(blox, target_pos, next_moves)
+        return cls(blox.width, blox.height, blox.pack_state(target_pos), distances, next_moves)
+
+    def pack_state(self, pos: Pos) -> int:
+        """
+        :return: state id of a position, the same as Bloxorz.pack_state.
+        """
+        return (pos.y * self.width + pos.x) * 3 + pos.orientation.value - 1
+
+    def unpack_state(self, state: int) -> Pos:
+        """
+        :return: Position of a state id, the same as Bloxorz.unpack_state.
+        """
+        tile, orientation = divmod(state, 3)
+        y, x = divmod(tile, self.width)
+        return Pos(x, y, Orientation(orientation + 1))
+
+    def distance(self, start: Pos) -> int:
+        """
+        Number of moves of an optimal path from a position to the target.
+        :param start: Start position of the brick, on the world map.
+        :return: Number of moves, None if the target can not be reached.
+        """
+        distance = self.distances[self.pack_state(start)]
+        return None if distance == UNREACHABLE else distance
+
+    def path(self, start: Pos) -> List[Direction]:
+        """
+        Moves of an optimal path from a position to the target, following the next move of each state.
+        :param start: Start position of the brick, on the world map.
+        :return: List of moves, None if the target can not be reached.
+        """
+        state = self.pack_state(start)
+        if self.distances[state] == UNREACHABLE:
+            return None
+
+        moves = list()
+        while state != self.target_state:
+            direction = Direction(self.next_moves[state])
+            moves.append(direction)
+            state = self.pack_state(Brick(self.unpack_state(state)).next_pos(direction))
+        return moves
+
+    def starts(self) -> List[Pos]:
+        """
+        :return: standing positions the target can be reached from.
+        """
+        return [self.unpack_state(state) for state in range(Orientation.STANDING.value - 1, len(self.distances), 3)
+                if self.distances[state] != UNREACHABLE]
+
+    def save(self, path: str):
+        """
+        Export the table to a binary file.
+        :param path: File path.
+        """
+        with open(path, 'wb') as file:
+            file.write(self.HEADER.pack(
+                self.MAGIC, self.VERSION, self.width, self.height, self.target_state, len(self.distances)))
+            distances = array('i', self.distances)
+            if sys.byteorder != 'little':
+                distances.byteswap()
+            distances.tofile(file)
+            file.write(bytes(self.next_moves))
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load a table exported with save. The file is memory mapped.
+        :param path: File path.
+        :return: DistanceMap object.
+        """
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mapped) < cls.HEADER.size:
+            raise ValueError("Distance map file '{}' is too short".format(path))
+        magic, version, width, height, target_state, num_states = cls.HEADER.unpack_from(mapped)
+        if magic != cls.MAGIC or version != cls.VERSION or len(mapped) != cls.HEADER.size + 5 * num_states:
+            raise ValueError("Distance map file '{}' has an unknown format".format(path))
+
+        # the memoryviews keep the mapping open for as long as they are referenced.
+        view = memoryview(mapped)
+        distances_end = cls.HEADER.size + 4 * num_states
+        distances = view[cls.HEADER.size:distances_end].cast('i')
+        if sys.byteorder != 'little':
+            distances = array('i', distances)
+            distances.byteswap()
+        return cls(width, height, target_state, distances, view[distances_end:].cast('b'))
+
+
+if __name__ == '__main__':
+    # build the distance map of a level file and export it.
+    if len(sys.argv) != 3:
+        print("usage: {} LEVEL_FILE DISTANCE_MAP_FILE".format(sys.argv[0]))
+        sys.exit(1)
+
+    from bloxorz import Bloxorz, parser
+    from level import Level
+
+    level = Level.load(sys.argv[1])
+    blox = Bloxorz(level, parser.parse_args(['--quiet', '--precompute']))
+    distance_map = DistanceMap.build(blox, Pos(level.target[0], level.target[1], Orientation.STANDING))
+    distance_map.save(sys.argv[2])
+
+    starts = distance_map.starts()
+    print("{} standing starts reach the target, longest optimal path {} moves".format(
+        len(starts), max(distance_map.distance(pos) for pos in starts)))
+    start_pos = Pos(level.start[0], level.start[1], Orientation.STANDING)
+    print("level start: {} moves".format(distance_map.distance(start_pos)))
@@ -0,0 +1,208 @@
+from heapq import heappush, heappop
+from math import inf
+from time import perf_counter
+from typing import List, Tuple
+
+from brick import Brick
+from direction import Direction
+from orientation import Orientation
+from pos import Pos
+from result import SearchResult
+from stats import SearchStats
+
+
+class DStarLite:
+    """
+    Incremental planner for world maps whose tiles change between moves (fragile tiles, timed platforms).
+    D* Lite keeps the g cost and the one step lookahead rhs cost of every state it searched, towards the target.
+    When tiles change, only the states covering those tiles and their neighbours are updated, and the next plan
+    repairs the costs that are no longer consistent instead of searching from scratch.
+    The start position can move along the path between plans, heuristic keys stay valid through the km offset.
+    """
+
+    def __init__(self, blox, start: Pos, target_pos: Pos):
+        """
+        :param blox: Bloxorz object providing the world map and the moves.
+        :param start: Start position of the brick.
+        :param target_pos: Target position of the brick.
+        """
+        if not blox.level.is_static():
+            raise ValueError("D* Lite is not supported on levels with switches and bridges")
+
+        self.blox = blox
+        self.start = start
+        self.start_state = blox.pack_state(start)
+        self.target_state = blox.pack_state(target_pos)
+
+        # state id -> cost, missing states have infinite costs.
+        self.g = dict()
+        self.rhs = {self.target_state: 0}
+
+        # min-heap of (key, state) entries, open_keys holds the current key of each open state,
+        # entries with another key are stale and skipped.
+        self.open_nodes = list()
+        self.open_keys = dict()
+
+        # heuristic cost of each state to the current start, reset when the start moves.
+        self.h_costs = dict()
+        self.km = 0
+
+        self.stats = SearchStats()
+        self.push(self.target_state)
+
+    def h_cost(self, state: int) -> int:
+        """
+        Lower bound on the number of rolls between a state and the start, counted per axis.
+        """
+        if state not in self.h_costs:
+            self.stats.heuristic_evals += 1
+            self.h_costs[state] = self.blox.distance_rolling(self.blox.unpack_state(state), self.start, True)
+        return self.h_costs[state]
+
+    def key(self, state: int) -> Tuple[int, int]:
+        """
+        Priority of an open state.
+        """
+        cost = min(self.g.get(state, inf), self.rhs.get(state, inf))
+        return cost + self.h_cost(state) + self.km, cost
+
+    def push(self, state: int):
+        """
+        Add a state to the open list, or update its key.
+        """
+        key = self.key(state)
+        self.open_keys[state] = key
+        heappush(self.open_nodes, (key, state))
+        self.stats.frontier(len(self.open_keys))
+
+    def top(self) -> Tuple[Tuple[int, int], int]:
+        """
+        :return: (key, state) of the open state with the lowest key, ((inf, inf), None) if the open list is empty.
+        """
+        while len(self.open_nodes) > 0:
+            key, state = self.open_nodes[0]
+            if self.open_keys.get(state) == key:
+                return key, state
+            heappop(self.open_nodes)
+        return (inf, inf), None
+
+    def neighbours(self, state: int) -> List[int]:
+        """
+        States one roll away, moves are reversible so successors and predecessors are the same.
+        :return: List of state ids, empty if the state itself is off the map.
+        """
+        if self.blox.is_off_map(self.blox.unpack_state(state)):
+            return list()
+        return [next_state for next_state, _ in self.blox.derive_moves(state)]
+
+    def update_state(self, state: int):
+        """
+        Recompute the rhs cost of a state from its neighbours, and put it on the open list if inconsistent.
+        """
+        if state != self.target_state:
+            self.rhs[state] = min((self.g.get(next_state, inf) + 1 for next_state in self.neighbours(state)),
+                                  default=inf)
+        self.open_keys.pop(state, None)
+        if self.g.get(state, inf) != self.rhs.get(state, inf):
+            self.push(state)
+
+    def compute_shortest_path(self):
+        """
+        Expand inconsistent states until the cost of the start is consistent and no open state can lower it.
+        """
+        while True:
+            key, state = self.top()
+            start_key = self.key(self.start_state)
+            if key >= start_key and self.rhs.get(self.start_state, inf) == self.g.get(self.start_state, inf):
+                return
+
+            new_key = self.key(state)
+            if key < new_key:
+                # the start moved since the state was added.
+                self.push(state)
+                continue
+
+            self.open_keys.pop(state)
+            self.stats.expanded += 1
+            if self.g.get(state, inf) > self.rhs.get(state, inf):
+                # overconsistent, the cost went down.
+                self.g[state] = self.rhs[state]
+                for next_state in self.neighbours(state):
+                    self.stats.generated += 1
+                    self.update_state(next_state)
+            else:
+                # underconsistent, the cost went up.
+                self.g[state] = inf
+                for next_state in self.neighbours(state) + [state]:
+                    self.stats.generated += 1
+                    self.update_state(next_state)
+
+    def plan(self) -> SearchResult:
+        """
+        Compute an optimal path from the start to the target, reusing the costs of the previous plans.
+        :return: SearchResult with the path found (None if the target can not be reached) and the counters of
+            this plan only.
+        """
+        self.stats = SearchStats()
+        start_time = perf_counter()
+        self.compute_shortest_path()
+        path = self.path()
+        elapsed = perf_counter() - start_time
+        self.stats.search_time = elapsed
+        return SearchResult(path, self.stats, elapsed)
+
+    def path(self) -> List[Direction]:
+        """
+        Follow the neighbours with the lowest g cost from the start to the target.
+        :return: List of moves, None if the target can not be reached.
+        """
+        if self.g.get(self.start_state, inf) == inf:
+            return None
+
+        moves = list()
+        state = self.start_state
+        while state != self.target_state:
+            next_state, direction = min(self.blox.derive_moves(state),
+                                        key=lambda move: self.g.get(move[0], inf))
+            moves.append(direction)
+            state = next_state
+        return moves
+
+    def move_start(self, start: Pos):
+        """
+        Move the start position, e.g. after the brick follows a few moves of the last plan.
+        :param start: New start position of the brick.
+        """
+        self.km += self.blox.distance_rolling(self.start, start, True)
+        self.start = start
+        self.start_state = self.blox.pack_state(start)
+        self.h_costs = dict()
+
+    def set_tiles(self, tiles: List[Tuple[int, int, int]]):
+        """
+        Change tiles of the world map, and update the states covering them and their neighbours.
+        :param tiles: List of (x, y, tile value) tuples, e.g. (x, y, Level.HOLE) for a vanishing tile.
+        """
+        self.blox.set_tiles(tiles)
+
+        changed = set()
+        for x, y, _ in tiles:
+            # states of the brick covering the tile: standing on it, lying across it from the left or from above.
+            for pos in (Pos(x, y, Orientation.STANDING), Pos(x - 1, y, Orientation.HORIZONTAL_LYING),
+                        Pos(x, y, Orientation.HORIZONTAL_LYING), Pos(x, y - 1, Orientation.VERTICAL_LYING),
+                        Pos(x, y, Orientation.VERTICAL_LYING)):
+                if 0 <= pos.x < self.blox.width and 0 <= pos.y < self.blox.height:
+                    changed.add(self.blox.pack_state(pos))
+
+        # neighbours gained or lost a move to the changed states, all rolls are checked as the changed
+        # states may have just left the map.
+        affected = set(changed)
+        for state in changed:
+            brick = Brick(self.blox.unpack_state(state))
+            for direction in Direction:
+                next_pos = brick.next_pos(direction)
+                if 0 <= next_pos.x < self.blox.width and 0 <= next_pos.y < self.blox.height:
+                    affected.add(self.blox.pack_state(next_pos))
+
+        for state in affected:
+            self.update_state(state)
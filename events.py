@@ -0,0 +1,80 @@
+from enum import Enum
+
+
+class SearchEvent(Enum):
+    """
+    Events emitted by the searches to their subscribers (see Bloxorz.subscribe).
+    Events carry arena indices and plain values only, subscribers format them if and when they need to.
+
+    EXPANDED: a node is expanded, with its f cost for the heuristic searches.
+    GENERATED: a node is added to the search tree, with its f cost for the heuristic searches.
+    REJECTED_OFF_MAP: a move from a node leaves the world map, with the direction of the move.
+    REJECTED_VISITED: a move from a node leads to a state already visited (or at a lower cost), with the direction.
+    PRUNED: a node is dropped by the search without being expanded (a stale open list entry, a node out of the beam),
+        or a move from a node is dropped (over the IDA* bound, in the transposition table), with the direction.
+    GOAL: the goal node is reached.
+    """
+    EXPANDED = 1
+    GENERATED = 2
+    REJECTED_OFF_MAP = 3
+    REJECTED_VISITED = 4
+    PRUNED = 5
+    GOAL = 6
+
+
+class ConsoleSubscriber:
+    """
+    Console output of the searches: the world map at each expanded node, unless in headless mode,
+    and a line per event in verbose mode.
+    """
+
+    def __init__(self, render: bool, verbose: bool):
+        """
+        :param render: Show the world map at each expanded node.
+        :param verbose: Show a line per event.
+        """
+        self.render = render
+        self.verbose = verbose
+
+    def __call__(self, event: SearchEvent, blox, node: int, arena, direction, f_cost):
+        """
+        Print an event.
+        :param event: SearchEvent enumeration.
+        :param blox: Bloxorz object running the search.
+        :param node: Arena index of the node.
+        :param arena: Arena holding the node.
+        :param direction: Direction of the move from the node, for the rejected and pruned moves, None otherwise.
+        :param f_cost: f cost of the node, None if the search does not estimate one.
+        """
+        f_cost_str = "" if f_cost is None else " [f_cost: {:.2f}]".format(f_cost)
+
+        if event is SearchEvent.EXPANDED:
+            if self.verbose:
+                print("{:10s}: {:21s} - {}".format("removed", "frontier node", blox.node_str(node, arena)))
+            # the frame rate of --animate is checked first, dropped frames cost no formatting.
+            if self.render and blox.get_renderer().frame_due():
+                # bidirectional searches grow a second tree from the target, in another arena.
+                side = "" if arena is blox.arena else ", Side: backward"
+                header = "Step: {}{}, Depth: {}, Cost: {} - {}{}".format(
+                    blox.stats.expanded, side, arena.depth[node], arena.g_cost[node], blox.node_str(node, arena),
+                    f_cost_str)
+                blox.show(blox.get_brick(node, arena), header)
+            return
+
+        if not self.verbose:
+            return
+
+        if direction is not None:
+            move_str = "[Parent: {}, Parent->{:5s}]".format(node, direction.name.lower())
+            if event is SearchEvent.REJECTED_OFF_MAP:
+                print("{:10s}: {:21s} - {}".format("rejected", "invalid move", move_str))
+            elif event is SearchEvent.REJECTED_VISITED:
+                print("{:10s}: {:21s} - {}".format("rejected", "visited node", move_str))
+            else:
+                print("{:10s}: {:21s} - {}{}".format("pruned", "move", move_str, f_cost_str))
+        elif event is SearchEvent.GENERATED:
+            print("{:10s}: {:21s} - {}{}".format("added", "new node", blox.node_str(node, arena), f_cost_str))
+        elif event is SearchEvent.PRUNED:
+            print("{:10s}: {:21s} - {}{}".format("pruned", "frontier node", blox.node_str(node, arena), f_cost_str))
+        elif event is SearchEvent.GOAL:
+            print("{:10s}: {:21s} - {}".format("reached", "goal node", blox.node_str(node, arena)))
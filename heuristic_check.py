@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Check the heuristic cost methods of A* against the exact distances to the target.
+For every cost method, reports the states where the heuristic overestimates (not admissible) and the moves
+where it drops by more than the cost of the move (not consistent), then the nodes expanded by A* and the
+length of the path it finds.
+"""
+import random
+import tempfile
+from typing import List
+
+from bloxorz import Bloxorz, parser, get_target_position
+from level import Level
+from heuristic_db import build_distances, UNREACHABLE
+from orientation import Orientation
+from pos import Pos
+
+COST_METHODS = ['euclidean', 'manhattan', 'roll', 'roll-axis', 'exact']
+
+
+def random_world(width: int, height: int, density: float, seed: int) -> List[List[int]]:
+    """
+    Generate a world map with randomly placed holes, the start tile at (0, 0) and the target tile near the
+    opposite corner.
+    :param width: Number of columns.
+    :param height: Number of rows.
+    :param density: Probability of a tile being available for brick navigation.
+    :param seed: Random seed.
+    :return: m*n matrix.
+    """
+    rng = random.Random(seed)
+    world = [[1 if rng.random() < density else 0 for _ in range(width)] for _ in range(height)]
+    world[0][0] = 1
+    world[height - 2][width - 2] = 9
+    return world
+
+
+def check_level(world: List[List[int]], cache_dir: str):
+    """
+    Check all the cost methods on a world map and print one line per cost method.
+    :param world: m*n matrix.
+    :param cache_dir: Directory for the exact heuristic cost tables.
+    """
+    level = Level.from_matrix(world, (0, 0))
+    blox = Bloxorz(level, parser.parse_args(['--quiet', '--cache-dir', cache_dir]))
+    x_pos, y_pos = get_target_position(level)
+    target_pos = Pos(x_pos, y_pos, Orientation.STANDING)
+    start_pos = Pos(0, 0, Orientation.STANDING)
+
+    distances = build_distances(blox, target_pos)
+    if distances[blox.pack_state(start_pos)] == UNREACHABLE:
+        print("{}x{}: target unreachable, skipped".format(len(world[0]), len(world)))
+        return
+
+    print("{}x{}: optimal path length {}".format(len(world[0]), len(world), distances[blox.pack_state(start_pos)]))
+    print("{:>12s} {:>12s} {:>14s} {:>10s} {:>10s}".format(
+        "cost method", "overestimates", "inconsistent", "expanded", "path"))
+
+    for cost_method in COST_METHODS:
+        blox.args.cost_method = cost_method
+        h_costs = blox.compute_heuristic_costs(target_pos)
+
+        overestimates = 0
+        inconsistent = 0
+        for state, distance in enumerate(distances):
+            if distance == UNREACHABLE:
+                continue
+            h_cost = blox.min_h_cost(h_costs, state)
+            if h_cost > distance:
+                overestimates += 1
+            for next_state, _ in blox.successors(state):
+                if h_cost > 1 + blox.min_h_cost(h_costs, next_state):
+                    inconsistent += 1
+
+        blox.args.search = 'a-star'
+        result = blox.solve(start_pos, target_pos)
+
+        print("{:>12s} {:>12d} {:>14d} {:>10d} {:>10d}".format(
+            cost_method, overestimates, inconsistent, result.expanded, result.cost))
+    print("")
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size, density, seed in [(10, 0.8, 5), (20, 0.8, 2), (30, 0.9, 3), (40, 1.0, 4)]:
+            check_level(random_world(size, size, density, seed), tmp_dir)
@@ -0,0 +1,112 @@
+import mmap
+import os
+import sys
+from array import array
+from pos import Pos
+
+# file layout: MAGIC, VERSION (4 bytes, little endian), then one native int32 distance per state id.
+MAGIC = b'BLXH'
+VERSION = 1
+HEADER_SIZE = len(MAGIC) + 4
+
+# distance of the states the target can not be reached from.
+UNREACHABLE = -1
+
+
+def level_key(blox, target_pos: Pos) -> str:
+    """
+    Hash of a world map and target, identifies the distance table of a level.
+    :param blox: Bloxorz object providing the world map.
+    :param target_pos: Target position of the brick.
+    :return: hex digest string.
+    """
+    import hashlib  # slow to import, and only the exact cost method needs it.
+    digest = hashlib.sha256()
+    digest.update("{}x{}:{}:{}:{}".format(
+        blox.width, blox.height, blox.pack_state(target_pos), sys.byteorder, VERSION).encode())
+    digest.update(blox.grid)
+    return digest.hexdigest()
+
+
+def build_distances(blox, target_pos: Pos, next_moves: array = None) -> array:
+    """
+    Compute the exact number of moves from every state to the target, with a BFS grown from the target.
+    Rolls of the brick are reversible, so the distance from the target to a state is the distance back.
+    :param blox: Bloxorz object providing the world map and the moves.
+    :param target_pos: Target position of the brick.
+    :param next_moves: Optional array, one entry per state id, filled with the Direction value of the first move
+        of an optimal path from each state to the target (0 for the target and the unreachable states).
+    :return: int32 array of distances indexed by state id, UNREACHABLE for the states not connected to the target.
+    """
+    if not blox.level.is_static():
+        raise ValueError("Exact distances are not supported on levels with switches and bridges")
+
+    num_states = blox.height * blox.width * 3
+    distances = array('i', [UNREACHABLE]) * num_states
+
+    target_state = blox.pack_state(target_pos)
+    distances[target_state] = 0
+    layer = [target_state]
+    depth = 0
+    while len(layer) > 0:
+        depth += 1
+        next_layer = list()
+        for state in layer:
+            for next_state, direction in blox.successors(state):
+                if distances[next_state] == UNREACHABLE:
+                    distances[next_state] = depth
+                    next_layer.append(next_state)
+                    if next_moves is not None:
+                        next_moves[next_state] = direction.opposite().value
+        layer = next_layer
+    return distances
+
+
+def map_distances(path: str, num_states: int):
+    """
+    Memory map a stored distance table.
+    :param path: Distance table file path.
+    :param num_states: Number of states of the level.
+    :return: int32 sequence of distances indexed by state id, None if the file is missing, stale or partial.
+    """
+    try:
+        with open(path, "rb") as file:
+            # an empty file can not be mapped, check the size first.
+            if os.fstat(file.fileno()).st_size != HEADER_SIZE + 4 * num_states:
+                return None
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+    if mapped[:HEADER_SIZE] != MAGIC + VERSION.to_bytes(4, "little"):
+        mapped.close()
+        return None
+    # the memoryview keeps the mapping open for as long as it is referenced.
+    return memoryview(mapped)[HEADER_SIZE:].cast('i')
+
+
+def load_distances(blox, target_pos: Pos, cache_dir: str):
+    """
+    Load the exact distance table of a level from the cache directory, building and storing it on the first use.
+    The file is memory mapped, so repeated runs do not pay for reading or building the table.
+    A missing, stale or partial file is built and stored again.
+    :param blox: Bloxorz object providing the world map and the moves.
+    :param target_pos: Target position of the brick.
+    :param cache_dir: Directory holding the distance tables.
+    :return: int32 sequence of distances indexed by state id.
+    """
+    path = os.path.join(cache_dir, level_key(blox, target_pos) + ".dist")
+    distances = map_distances(path, blox.height * blox.width * 3)
+    if distances is not None:
+        return distances
+
+    distances = build_distances(blox, target_pos)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # write to a temporary file first and replace the old file, so concurrent runs never see a partial table.
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC + VERSION.to_bytes(4, "little"))
+        distances.tofile(file)
+    os.replace(tmp_path, path)
+    return distances
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+import mmap
+import struct
+import sys
+from typing import Dict, List, Tuple
+
+
+class Level:
+    """
+    A world map stored as a packed grid: one byte per tile, row by row.
+    Tile values are HOLE (0), TILE (1), SOFT_SWITCH (2), HARD_SWITCH (3), BRIDGE (4) and TARGET (9).
+
+    Bridge tiles are only solid while their bridge is open. Each bridge has a bit in the bridge mask, and switches
+    open (on), close (off) or toggle a set of bridges when the brick lands on them: soft switches in any orientation,
+    hard switches only with the brick standing.
+
+    Levels are loaded from text or binary files.
+    Text files hold one row of tiles per line, using the characters '0', '1', '9' and 'S' for the start tile
+    (a regular tile), 'o' for soft switches, 'x' for hard switches and the other capital letters for the tiles of
+    the bridge of that name. Switches are defined by lines 'switch X Y ACTION BRIDGES', e.g. 'switch 4 1 toggle AB',
+    and the bridges open at the start by a line 'open BRIDGES'. Blank lines and lines starting with '#' are ignored.
+    Binary files hold a fixed size header followed by the grid bytes and the bridges and switches, the grid is
+    memory mapped when loaded.
+    """
+
+    HOLE = 0
+    TILE = 1
+    SOFT_SWITCH = 2
+    HARD_SWITCH = 3
+    BRIDGE = 4
+    TARGET = 9
+
+    MAGIC = b'BLXL'
+    VERSION = 2
+
+    # magic, version, width, height, start x, start y.
+    HEADER = struct.Struct('<4sIIIII')
+
+    # after the grid (version 2): number of bridge tiles, number of switches, initial bridge mask,
+    # then (tile index, bridge bit) per bridge tile and (tile index, action, bridge mask) per switch.
+    MECHANICS = struct.Struct('<IIQ')
+    BRIDGE_TILE = struct.Struct('<II')
+    SWITCH = struct.Struct('<IBQ')
+
+    # text tile characters -> tile values, all other characters but the bridge names are rejected.
+    TEXT_TILES = {'0': HOLE, '1': TILE, '9': TARGET, 'S': TILE, 'o': SOFT_SWITCH, 'x': HARD_SWITCH}
+    BRIDGE_NAMES = 'ABCDEFGHIJKLMNOPQRTUVWXYZ'
+
+    ACTIONS = ('toggle', 'on', 'off')
+
+    # tile values of a level built from a matrix, see from_matrix.
+    MATRIX_TILES = (HOLE, TILE, TARGET)
+
+    def __init__(self, width: int, height: int, grid, start: Tuple[int, int], buffer=None, offset: int = 0,
+                 bridges: Dict[int, int] = None, switches: Dict[int, Tuple[str, int]] = None, initial_mask: int = 0):
+        """
+        :param width: Number of columns.
+        :param height: Number of rows.
+        :param grid: Tile values, row by row (bytes, bytearray or memoryview).
+        :param start: x, y coordinates of the start tile (0 based index).
+        :param buffer: Searchable buffer holding the grid (bytes, bytearray or mmap object), defaults to the grid.
+        :param offset: Offset of the grid in the buffer.
+        :param bridges: Bridge tile index (y * width + x) -> bit of its bridge in the bridge mask.
+        :param switches: Switch tile index -> (action, mask of the bridges switched).
+        :param initial_mask: Bridge mask at the start, bits of the open bridges.
+        """
+        if width <= 0 or height <= 0 or len(grid) != width * height:
+            raise ValueError("Bad level size {}x{} for {} tiles".format(width, height, len(grid)))
+
+        self.width = width
+        self.height = height
+        self.grid = grid
+        self.start = start
+        self.bridges = dict() if bridges is None else bridges
+        self.switches = dict() if switches is None else switches
+        self.initial_mask = initial_mask
+
+        buffer = grid if buffer is None else buffer
+        end = offset + width * height
+        target = buffer.find(bytes([self.TARGET]), offset, end)
+        if target < 0:
+            raise ValueError("Level has no target tile")
+        if buffer.find(bytes([self.TARGET]), target + 1, end) >= 0:
+            raise ValueError("Level has more than one target tile")
+        target -= offset
+        self.target = (target % width, target // width)
+
+        start_x, start_y = start
+        if not (0 <= start_x < width and 0 <= start_y < height) or grid[start_y * width + start_x] == self.HOLE:
+            raise ValueError("Start position {} is not on a tile".format(start))
+
+        for index in self.bridges:
+            if grid[index] != self.BRIDGE:
+                raise ValueError("Bridge tile {} is not a bridge".format((index % width, index // width)))
+        for index, (action, _) in self.switches.items():
+            if grid[index] not in (self.SOFT_SWITCH, self.HARD_SWITCH) or action not in self.ACTIONS:
+                raise ValueError("Bad switch {}".format((index % width, index // width)))
+
+    def is_static(self) -> bool:
+        """
+        :return: True if the world map never changes during the game (no bridges or switches).
+        """
+        return len(self.bridges) == 0 and len(self.switches) == 0
+
+    def switch_effect(self, blocks: List[List[int]], standing: bool) -> Tuple[int, int, int]:
+        """
+        Combined effect of the switches pressed by a brick landing on the given blocks.
+        A bridge mask m becomes ((m | set) & ~clear) ^ toggle.
+        :param blocks: x, y coordinates of the blocks occupied by the brick, on the world map.
+        :param standing: True if the brick is standing, hard switches are only pressed by a standing brick.
+        :return: Tuple of the (set, clear, toggle) bridge masks.
+        """
+        set_mask, clear_mask, toggle_mask = 0, 0, 0
+        for x, y in blocks:
+            index = y * self.width + x
+            if index not in self.switches or (self.grid[index] == self.HARD_SWITCH and not standing):
+                continue
+            action, mask = self.switches[index]
+            if action == 'on':
+                set_mask, clear_mask, toggle_mask = set_mask | mask, clear_mask & ~mask, toggle_mask & ~mask
+            elif action == 'off':
+                set_mask, clear_mask, toggle_mask = set_mask & ~mask, clear_mask | mask, toggle_mask & ~mask
+            else:
+                toggle_mask ^= mask
+        return set_mask, clear_mask, toggle_mask
+
+    def bridge_bits(self, blocks: List[List[int]]) -> int:
+        """
+        :param blocks: x, y coordinates of blocks on the world map.
+        :return: mask of the bridges that must be open to hold the blocks.
+        """
+        bits = 0
+        for x, y in blocks:
+            index = y * self.width + x
+            if index in self.bridges:
+                bits |= 1 << self.bridges[index]
+        return bits
+
+    def mechanics_bytes(self) -> bytes:
+        """
+        :return: the bridges and switches of the level, as stored after the grid in binary level files.
+        """
+        data = self.MECHANICS.pack(len(self.bridges), len(self.switches), self.initial_mask)
+        for index, bit in sorted(self.bridges.items()):
+            data += self.BRIDGE_TILE.pack(index, bit)
+        for index, (action, mask) in sorted(self.switches.items()):
+            data += self.SWITCH.pack(index, self.ACTIONS.index(action), mask)
+        return data
+
+    @classmethod
+    def from_matrix(cls, matrix: List[List[int]], start: Tuple[int, int]):
+        """
+        Create a level from a m*n matrix of tile values.
+        A matrix has no bridges or switches, its tile values are HOLE, TILE and TARGET only.
+        :param matrix: m*n matrix.
+        :param start: x, y coordinates of the start tile (0 based index).
+        :return: Level object.
+        """
+        if len(matrix) == 0 or len(matrix[0]) == 0:
+            raise ValueError("Matrix has no tiles")
+        for y, row in enumerate(matrix):
+            if len(row) != len(matrix[0]):
+                raise ValueError("Row {} of the matrix has {} tiles, expected {}".format(
+                    y + 1, len(row), len(matrix[0])))
+            for x, value in enumerate(row):
+                if value not in cls.MATRIX_TILES:
+                    if value in (cls.SOFT_SWITCH, cls.HARD_SWITCH, cls.BRIDGE):
+                        raise ValueError("Tile {} at {} needs bridges and switches, only level files define them"
+                                         .format(value, (x, y)))
+                    raise ValueError("Unknown tile {!r} at {}".format(value, (x, y)))
+        return cls(len(matrix[0]), len(matrix), bytearray(value for row in matrix for value in row), start)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load a level file, in binary format if it starts with the binary magic bytes, in text format otherwise.
+        :param path: Level file path.
+        :return: Level object.
+        """
+        with open(path, 'rb') as file:
+            magic = file.read(len(cls.MAGIC))
+        if magic == cls.MAGIC:
+            return cls.load_binary(path)
+        return cls.load_text(path)
+
+    @classmethod
+    def load_text(cls, path: str):
+        """
+        Load a level from a text file.
+        :param path: Level file path.
+        :return: Level object.
+        """
+        with open(path) as file:
+            lines = [line.strip() for line in file]
+        lines = [line for line in lines if line and not line.startswith('#')]
+        rows = [line for line in lines if ' ' not in line and line != 'open']
+        if len(rows) == 0:
+            raise ValueError("Level file '{}' has no tiles".format(path))
+
+        width = len(rows[0])
+        start = None
+        grid = bytearray()
+        bridges = dict()
+        for y, row in enumerate(rows):
+            if len(row) != width:
+                raise ValueError("Row {} of level file '{}' has {} tiles, expected {}".format(
+                    y + 1, path, len(row), width))
+            for x, char in enumerate(row):
+                if char in cls.BRIDGE_NAMES:
+                    bridges[y * width + x] = cls.BRIDGE_NAMES.index(char)
+                elif char not in cls.TEXT_TILES:
+                    raise ValueError("Unknown tile '{}' in level file '{}'".format(char, path))
+                if char == 'S':
+                    start = (x, y)
+            grid += row.encode().translate(cls.text_table())
+
+        if start is None:
+            raise ValueError("Level file '{}' has no start tile 'S'".format(path))
+
+        switches = dict()
+        initial_mask = 0
+        for line in lines:
+            words = line.split()
+            if words[0] == 'open' and len(words) <= 2:
+                initial_mask |= cls.bridge_mask(words[1] if len(words) == 2 else '', path)
+            elif words[0] == 'switch' and len(words) == 5 and words[1].isdigit() and words[2].isdigit():
+                index = int(words[2]) * width + int(words[1])
+                if index >= len(grid) or index in switches:
+                    raise ValueError("Bad switch line '{}' in level file '{}'".format(line, path))
+                switches[index] = (words[3], cls.bridge_mask(words[4], path))
+            elif ' ' in line:
+                raise ValueError("Unknown line '{}' in level file '{}'".format(line, path))
+        return cls(width, len(rows), grid, start, bridges=bridges, switches=switches, initial_mask=initial_mask)
+
+    @classmethod
+    def bridge_mask(cls, names: str, path: str) -> int:
+        """
+        :param names: Bridge names, e.g. 'AB'.
+        :param path: Level file path, for error messages.
+        :return: mask of the named bridges.
+        """
+        mask = 0
+        for name in names:
+            if name not in cls.BRIDGE_NAMES:
+                raise ValueError("Unknown bridge '{}' in level file '{}'".format(name, path))
+            mask |= 1 << cls.BRIDGE_NAMES.index(name)
+        return mask
+
+    @classmethod
+    def text_table(cls) -> bytes:
+        """
+        :return: Translation table from text tile characters to tile values.
+        """
+        table = bytearray(range(256))
+        for char, value in cls.TEXT_TILES.items():
+            table[ord(char)] = value
+        for char in cls.BRIDGE_NAMES:
+            table[ord(char)] = cls.BRIDGE
+        return bytes(table)
+
+    @classmethod
+    def load_binary(cls, path: str):
+        """
+        Load a level from a binary file. The file is memory mapped, tiles are read from the page cache on access.
+        :param path: Level file path.
+        :return: Level object.
+        """
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mapped) < cls.HEADER.size:
+            raise ValueError("Level file '{}' is too short".format(path))
+        magic, version, width, height, start_x, start_y = cls.HEADER.unpack_from(mapped)
+        if magic != cls.MAGIC or version not in (1, cls.VERSION):
+            raise ValueError("Level file '{}' has an unknown format".format(path))
+
+        # the memoryview keeps the mapping open for as long as the grid is referenced.
+        grid_end = cls.HEADER.size + width * height
+        grid = memoryview(mapped)[cls.HEADER.size:grid_end]
+
+        bridges = dict()
+        switches = dict()
+        initial_mask = 0
+        if version > 1:
+            try:
+                num_bridges, num_switches, initial_mask = cls.MECHANICS.unpack_from(mapped, grid_end)
+                offset = grid_end + cls.MECHANICS.size
+                for _ in range(num_bridges):
+                    index, bit = cls.BRIDGE_TILE.unpack_from(mapped, offset)
+                    bridges[index] = bit
+                    offset += cls.BRIDGE_TILE.size
+                for _ in range(num_switches):
+                    index, action, mask = cls.SWITCH.unpack_from(mapped, offset)
+                    switches[index] = (cls.ACTIONS[action], mask)
+                    offset += cls.SWITCH.size
+            except (struct.error, IndexError):
+                raise ValueError("Level file '{}' is truncated".format(path))
+        return cls(width, height, grid, (start_x, start_y), mapped, cls.HEADER.size, bridges, switches, initial_mask)
+
+    def save_binary(self, path: str):
+        """
+        Store the level in a binary file.
+        :param path: Level file path.
+        """
+        with open(path, 'wb') as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.width, self.height, *self.start))
+            file.write(self.grid[:])
+            file.write(self.mechanics_bytes())
+
+    def rows(self):
+        """
+        :return: generator of the rows of tile values, as bytes.
+        """
+        for y in range(self.height):
+            yield bytes(self.grid[y * self.width:(y + 1) * self.width])
+
+
+if __name__ == '__main__':
+    # convert a text level file to the binary format.
+    if len(sys.argv) != 3:
+        print("usage: {} LEVEL_FILE BINARY_LEVEL_FILE".format(sys.argv[0]))
+        sys.exit(1)
+    Level.load(sys.argv[1]).save_binary(sys.argv[2])
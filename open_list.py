@@ -0,0 +1,111 @@
+from collections import deque
+from heapq import heappush, heappop
+from math import inf
+from typing import Tuple
+
+
+class HeapOpenList:
+    """
+    Open list of the UCS and A* searches on a binary heap.
+    Nodes are popped by lowest f cost, then highest g cost (deepest node first), then insertion order.
+    Arena indices grow with insertion, so the node index breaks the last ties.
+    """
+
+    def __init__(self):
+        # min-heap of (f_cost, -g_cost, node index) tuples.
+        self.heap = list()
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, f_cost, g_cost: int, node: int):
+        """
+        Add a node.
+        :param f_cost: f cost of the node.
+        :param g_cost: Path cost of the node.
+        :param node: Arena index of the node.
+        """
+        heappush(self.heap, (f_cost, -g_cost, node))
+
+    def pop(self) -> Tuple:
+        """
+        Remove the next node to expand.
+        :return: (f_cost, node index) tuple.
+        """
+        f_cost, _, node = heappop(self.heap)
+        return f_cost, node
+
+
+class BucketOpenList:
+    """
+    Open list of the UCS and A* searches on a bucket queue, for integer f costs.
+    Nodes are kept in FIFO buckets indexed by f cost then g cost, and popped in the same order as HeapOpenList:
+    lowest f cost, then highest g cost, then insertion order. Pushing a node is constant time, popping one only
+    moves past the empty buckets, as the f costs of a search grow by small steps.
+    Nodes with an infinite f cost (unreachable with the exact costs) are popped last, in insertion order.
+    """
+
+    def __init__(self):
+        # buckets[f_cost][g_cost]: deque of node indices. Empty g buckets at the end of an f bucket are dropped.
+        self.buckets = list()
+        self.counts = list()
+        self.unreachable = deque()
+
+        # lowest f cost of the nodes in the buckets, and number of nodes in the buckets.
+        self.min_f_cost = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size + len(self.unreachable)
+
+    def push(self, f_cost, g_cost: int, node: int):
+        """
+        Add a node.
+        :param f_cost: f cost of the node, an integer or inf.
+        :param g_cost: Path cost of the node.
+        :param node: Arena index of the node.
+        """
+        if f_cost == inf:
+            self.unreachable.append(node)
+            return
+
+        if f_cost >= len(self.buckets):
+            self.buckets += [list() for _ in range(f_cost + 1 - len(self.buckets))]
+            self.counts += [0] * (f_cost + 1 - len(self.counts))
+        bucket = self.buckets[f_cost]
+        if g_cost >= len(bucket):
+            bucket += [deque() for _ in range(g_cost + 1 - len(bucket))]
+        bucket[g_cost].append(node)
+
+        self.counts[f_cost] += 1
+        self.size += 1
+        # the f costs pushed only go down with inconsistent heuristics.
+        if f_cost < self.min_f_cost:
+            self.min_f_cost = f_cost
+
+    def pop(self) -> Tuple:
+        """
+        Remove the next node to expand.
+        :return: (f_cost, node index) tuple.
+        """
+        if self.size == 0:
+            return inf, self.unreachable.popleft()
+
+        while self.counts[self.min_f_cost] == 0:
+            self.min_f_cost += 1
+        f_cost = self.min_f_cost
+        bucket = self.buckets[f_cost]
+        node = bucket[-1].popleft()
+        while bucket and not bucket[-1]:
+            bucket.pop()
+
+        self.counts[f_cost] -= 1
+        self.size -= 1
+        return f_cost, node
+
+
+# open list backends by --open-list choice.
+OPEN_LISTS = {
+    'heap': HeapOpenList,
+    'bucket': BucketOpenList
+}
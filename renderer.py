@@ -0,0 +1,109 @@
+import sys
+from time import perf_counter
+from typing import List
+
+from level import Level
+
+STYLES = {
+    "unicode": {
+        "tile": "⬜",
+        "hole": "⬛",
+        "brick": "🟧",
+        "target": "❎",
+        "switch": "🔘",
+        "bridge": "🟫"
+    },
+    "ascii": {
+        "tile": "1",
+        "hole": "0",
+        "brick": "X",
+        "target": "+",
+        "switch": "o",
+        "bridge": "="
+    }
+}
+
+# ANSI escape codes: clear the screen, move the cursor to the top left corner, clear the rest of the line.
+CLEAR_SCREEN = "\x1b[2J"
+CURSOR_HOME = "\x1b[H"
+CLEAR_LINE = "\x1b[K"
+
+
+class MapRenderer:
+    """
+    Terminal display of the world map and the brick.
+    The rows of the map are built once, each frame only replaces the (one or two) cells of the brick
+    and is written to the terminal in a single write.
+    In animation mode the frames are drawn in place, over the previous frame, and frames coming faster than
+    the frame rate are dropped, so the display does not slow the search down.
+    """
+
+    def __init__(self, grid, width: int, height: int, style: str = 'unicode', animate: bool = False,
+                 fps: float = 0):
+        """
+        :param grid: Tile values, row by row.
+        :param width: Width of the world map.
+        :param height: Height of the world map.
+        :param style: 'unicode' or 'ascii', see STYLES.
+        :param animate: Draw the frames in place with ANSI escape codes, instead of one after the other.
+        :param fps: Maximum number of frames drawn per second in animation mode, 0 for no limit.
+        """
+        self.style = STYLES[style]
+        self.animate = animate
+        self.frame_interval = 1 / fps if animate and fps > 0 else 0.0
+        self.last_frame_time = None
+
+        # every style character is a single code point, so the cell at x is the character at x of its row.
+        chars = {Level.TARGET: self.style['target'], Level.SOFT_SWITCH: self.style['switch'],
+                 Level.HARD_SWITCH: self.style['switch'], Level.BRIDGE: self.style['bridge'],
+                 Level.TILE: self.style['tile']}
+        self.rows = ["".join(chars.get(grid[y * width + x], self.style['hole']) for x in range(width))
+                     for y in range(height)]
+
+    def frame(self, blocks: List[List[int]], header: str = None) -> str:
+        """
+        Text of a frame: the header line, then the world map with the brick.
+        :param blocks: x, y coordinates of the blocks occupied by the brick.
+        :param header: First line of the frame, None for no header.
+        :return: frame string, ending with an empty line.
+        """
+        rows = list(self.rows)
+        for x, y in blocks:
+            rows[y] = rows[y][:x] + self.style['brick'] + rows[y][x + 1:]
+
+        if self.animate:
+            # lines are cleared after their text, in case the previous frame had a longer header.
+            lines = ([header] if header is not None else []) + rows
+            return CURSOR_HOME + (CLEAR_LINE + "\n").join(lines) + CLEAR_LINE + "\n\n"
+        return ("" if header is None else header + "\n") + "\n".join(rows) + "\n\n"
+
+    def frame_due(self) -> bool:
+        """
+        Check the frame rate budget, before building a frame and its header.
+        :return: True if a frame drawn now would be written, False if it would be dropped.
+        """
+        return not self.animate or self.last_frame_time is None or \
+            perf_counter() - self.last_frame_time >= self.frame_interval
+
+    def draw(self, blocks: List[List[int]], header: str = None, force: bool = False) -> bool:
+        """
+        Write a frame to stdout, unless it comes too soon after the previous frame in animation mode.
+        :param blocks: x, y coordinates of the blocks occupied by the brick.
+        :param header: First line of the frame, None for no header.
+        :param force: Write the frame even if it comes too soon, e.g. the final state of the search.
+        :return: True if the frame was written, False if it was dropped.
+        """
+        if self.animate:
+            if not force and not self.frame_due():
+                return False
+            now = perf_counter()
+            text = self.frame(blocks, header)
+            if self.last_frame_time is None:
+                text = CLEAR_SCREEN + text
+            self.last_frame_time = now
+            sys.stdout.write(text)
+            sys.stdout.flush()
+            return True
+
+        sys.stdout.write(self.frame(blocks, header))
+        return True
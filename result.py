@@ -0,0 +1,66 @@
+from typing import List
+from direction import Direction
+from stats import SearchStats
+
+
+class SearchResult:
+    """
+    Outcome of a search: the moves found, their cost, the number of nodes expanded and generated,
+    the largest frontier and the time spent searching. The other counters of the search are kept in stats.
+    """
+
+    def __init__(self, path: List[Direction], stats: SearchStats, elapsed: float, cached: bool = False,
+                 bound: float = None):
+        """
+        :param path: List of moves from the start position to the target, None if no path was found.
+        :param stats: Counters and phase timers of the search.
+        :param elapsed: Search time in seconds, the heuristic setup and the display included.
+        :param cached: True if the result was taken from the solution cache, with the stats of the original search.
+        :param bound: Suboptimality bound of the path (cost over the optimal cost at most), None if not given
+            by the search.
+        """
+        self.path = path
+        self.cached = cached
+        self.bound = bound
+        self.cost = None if path is None else len(path)
+        self.stats = stats
+        self.expanded = stats.expanded
+        self.generated = stats.generated
+        self.max_frontier = stats.max_frontier
+        self.elapsed = elapsed
+
+    def to_dict(self) -> dict:
+        """
+        :return: Result as a dictionary of plain values, moves given by their lowercase names.
+        """
+        return {
+            "path": None if self.path is None else [direction.name.lower() for direction in self.path],
+            "cost": self.cost,
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "max_frontier": self.max_frontier,
+            "elapsed": self.elapsed,
+            "cached": self.cached,
+            "bound": self.bound,
+            "stats": self.stats.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict, elapsed: float, cached: bool = False):
+        """
+        :param values: Result dictionary created with to_dict.
+        :param elapsed: Time spent getting the result in seconds.
+        :param cached: True if the result was taken from the solution cache.
+        :return: SearchResult object.
+        """
+        path = None if values["path"] is None else [Direction[name.upper()] for name in values["path"]]
+        return cls(path, SearchStats.from_dict(values["stats"]), elapsed, cached, values.get("bound"))
+
+    def __str__(self):
+        """
+        String representation, the path in the format shown at the end of a search.
+        :return: Formatted path string.
+        """
+        if self.path is None:
+            return "NO PATH FOUND"
+        return "[START] " + "".join("-> {} ".format(direction.name.lower()) for direction in self.path) + "[GOAL]"
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Long running solver, answering JSON solve requests on a unix domain socket.
+Searches run in a pool of worker processes, each worker keeps the Bloxorz objects of the levels it solved last
+(transition tables and heuristic costs included) for the later requests on the same levels.
+
+    $ python3 ./bloxorz.py serve --socket /tmp/bloxorz.sock -j 4
+
+Requests and responses are JSON objects, one per line. A solve request names a level of the levels directory
+(or holds the grid of tile values), and optionally the start and target x, y coordinates and the search options:
+
+    {"id": 1, "level": "level1", "search": "a-star", "cost_method": "roll"}
+    {"id": 2, "grid": [[1, 1, 1], [1, 1, 9]], "start": [0, 0], "search": "bfs"}
+
+Responses hold the id of the request, the search result (see SearchResult.to_dict) or an error message, and the
+time spent answering the request in milliseconds. Responses on a connection are sent as the searches complete,
+not in the order of the requests. The {"command": "stats"} request returns the latency percentiles.
+
+The stub client sends the requests read from stdin, one per line, and prints the responses:
+
+    $ echo '{"id": 1, "level": "level1"}' | python3 ./serve.py --client --socket /tmp/bloxorz.sock
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+import sys
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from bloxorz import ARGUMENT_CHOICES, Bloxorz, level_files, parser as bloxorz_parser, validate_search_order
+from level import Level
+from orientation import Orientation
+from pos import Pos
+
+# search options a request may set, with their types.
+OPTIONS = {
+    "search": str,
+    "cost_method": str,
+    "open_list": str,
+    "depth_limit": int,
+    "beam_width": int,
+    "tt_size": int,
+    "weight": float,
+    "node_budget": int,
+    "time_budget": float
+}
+
+# per worker process: (level key, order) -> Bloxorz object, with its transition table and heuristic costs.
+# The least recently used ones are dropped over MAX_SOLVERS, inline grids would grow the cache without end.
+solvers = OrderedDict()
+MAX_SOLVERS = 64
+
+
+def get_solver(level: Level, key: str, order: str, precompute: bool, cache_dir: str) -> Bloxorz:
+    """
+    Bloxorz object of a level and search order, built on the first request of the worker process for them.
+    :param level: The level, only used on the first request.
+    :param key: Level file path, or hash of an inline grid.
+    :param order: Order of search directions.
+    :param precompute: Precompute the state transition table.
+    :param cache_dir: Directory of the exact heuristic cost tables.
+    :return: Bloxorz object.
+    """
+    if (key, order) not in solvers:
+        blox_args = ['--quiet', '--order', order, '--cache-dir', cache_dir]
+        blox_args += ['--precompute'] if precompute else []
+        solvers[key, order] = Bloxorz(level, bloxorz_parser.parse_args(blox_args))
+        if len(solvers) > MAX_SOLVERS:
+            solvers.popitem(last=False)
+    solvers.move_to_end((key, order))
+    return solvers[key, order]
+
+
+def start_worker():
+    """
+    Initializer of the worker processes, interrupts are left to the server, which shuts the pool down.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def warm_up(paths: List[str], precompute: bool, cache_dir: str):
+    """
+    Load levels in a worker process before the first requests. Runs in a worker process.
+    :param paths: Level file paths.
+    :param precompute: Precompute the state transition table.
+    :param cache_dir: Directory of the exact heuristic cost tables.
+    """
+    for path in paths[:MAX_SOLVERS]:
+        get_solver(Level.load(path), path, 'LRUD', precompute, cache_dir)
+
+
+def solve_request(request: dict, path: str, precompute: bool, cache_dir: str) -> dict:
+    """
+    Solve a request. Runs in a worker process.
+    :param request: Request dictionary.
+    :param path: Level file path of the level id of the request, None for an inline grid.
+    :param precompute: Precompute the state transition table.
+    :param cache_dir: Directory of the exact heuristic cost tables.
+    :return: Result dictionary, see SearchResult.to_dict.
+    """
+    order = validate_search_order(request.get("order", "LRUD"))
+    start = request.get("start")
+
+    if path is not None:
+        level, key = None, path
+        if (key, order) not in solvers:
+            level = Level.load(path)
+    else:
+        # the cached Level keeps the start of the first request on the grid, the start is always the request's.
+        start = start or (0, 0)
+        level = Level.from_matrix(request["grid"], tuple(start))
+        key = hashlib.sha256("{}:".format(level.width).encode() + bytes(level.grid)).hexdigest()
+    blox = get_solver(level, key, order, precompute, cache_dir)
+
+    # options not given by the request are reset to the defaults, the Bloxorz object is shared.
+    for name in OPTIONS:
+        setattr(blox.args, name, request.get(name, bloxorz_parser.get_default(name)))
+
+    start = start or blox.level.start
+    target = request.get("target") or blox.level.target
+    start_pos = Pos(start[0], start[1], Orientation.STANDING)
+    target_pos = Pos(target[0], target[1], Orientation.STANDING)
+    for name, pos in (("start", start_pos), ("target", target_pos)):
+        if blox.is_off_map(pos):
+            raise ValueError("The {} position {}, {} is not on a tile".format(name, pos.x, pos.y))
+    return blox.solve(start_pos, target_pos).to_dict()
+
+
+def validate_request(request, levels: Dict[str, str]) -> str:
+    """
+    Check a solve request before sending it to a worker.
+    :param request: Decoded request.
+    :param levels: Level id -> level file path.
+    :return: Level file path, None for an inline grid. Raises ValueError for a bad request.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+
+    for name, value in request.items():
+        if name in OPTIONS:
+            expected = (int, float) if OPTIONS[name] is float else OPTIONS[name]
+            if value is not None and not isinstance(value, expected):
+                raise ValueError("Option '{}' must be of type {}".format(name, OPTIONS[name].__name__))
+            if name in ARGUMENT_CHOICES and value not in ARGUMENT_CHOICES[name]:
+                raise ValueError("Bad {} '{}'. Must be one of {}".format(
+                    name, value, ', '.join(ARGUMENT_CHOICES[name])))
+        elif name not in ("id", "level", "grid", "start", "target", "order"):
+            raise ValueError("Unknown request field '{}'".format(name))
+
+    for name in ("start", "target"):
+        if request.get(name) is not None and (not isinstance(request[name], list) or len(request[name]) != 2):
+            raise ValueError("Field '{}' must be a list of x, y coordinates".format(name))
+
+    if "grid" in request:
+        return None
+    if request.get("level") not in levels:
+        raise ValueError("Unknown level '{}'".format(request.get("level")))
+    return levels[request["level"]]
+
+
+def percentiles(latencies) -> dict:
+    """
+    Latency percentiles (nearest rank) of the requests answered.
+    :param latencies: Latencies in milliseconds.
+    :return: Dictionary of the number of requests, the 50th, 90th and 99th percentiles and the maximum latency.
+    """
+    ordered = sorted(latencies)
+    stats = {"requests": len(ordered)}
+    for name, rank in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)):
+        stats[name] = ordered[max(0, -int(-rank * len(ordered)) - 1)] if len(ordered) > 0 else None
+    return stats
+
+
+class Server:
+    """
+    asyncio server of the solve requests, sending the searches to a process pool.
+    """
+
+    # number of latencies kept for the percentiles.
+    LATENCY_WINDOW = 10000
+
+    # longest request line read, inline grids included. Longer requests are answered with an error.
+    MAX_REQUEST_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, args: argparse.Namespace):
+        """
+        :param args: Server arguments.
+        """
+        self.args = args
+        # workers are started on demand, forked workers would inherit the sockets of the open connections
+        # and keep them open after the server closes them.
+        self.executor = ProcessPoolExecutor(max_workers=args.jobs, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=start_worker)
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+        # level id (file name without extension) -> level file path.
+        self.levels = {os.path.splitext(os.path.basename(path))[0]: path for path in level_files([args.levels])}
+
+    async def answer(self, request) -> dict:
+        """
+        Answer a request.
+        :param request: Decoded request.
+        :return: Response dictionary.
+        """
+        start_time = perf_counter()
+        response = {"id": request.get("id")} if isinstance(request, dict) else {"id": None}
+        try:
+            if isinstance(request, dict) and request.get("command") == "stats":
+                response.update(percentiles(self.latencies))
+                return response
+
+            path = validate_request(request, self.levels)
+            loop = asyncio.get_running_loop()
+            response.update(await loop.run_in_executor(
+                self.executor, solve_request, request, path, self.args.precompute, self.args.cache_dir))
+        except Exception as e:
+            # a bad level, grid or position fails the request only, the server goes on.
+            response["error"] = "{}: {}".format(type(e).__name__, e)
+
+        latency = (perf_counter() - start_time) * 1000
+        self.latencies.append(latency)
+        response["latency"] = latency
+        return response
+
+    @staticmethod
+    async def read_request(reader: asyncio.StreamReader) -> bytes:
+        """
+        Read a request line, at most the limit of the reader (see MAX_REQUEST_BYTES).
+        :param reader: Stream of the connection.
+        :return: Request line, empty at the end of the stream. Raise LimitOverrunError for a longer line,
+            after skipping it, so the next requests of the connection are still read.
+        """
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            # last request, without a newline.
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            overrun = e
+
+        # the bytes of the line are left in the reader, drop them up to the end of the line.
+        while True:
+            try:
+                await reader.readexactly(overrun.consumed)
+                await reader.readuntil(b"\n")
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as e:
+                overrun = e
+        raise overrun
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Answer the requests of a connection, each request in its own task so slow searches do not hold back the
+        responses to the fast ones.
+        """
+        tasks = set()
+
+        async def send(response: dict):
+            # the client is gone, the responses of its other requests are dropped as well.
+            if writer.is_closing():
+                return
+            try:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                writer.close()
+
+        async def respond(line: bytes):
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"id": None, "error": "Bad request: {}".format(e)}
+            else:
+                response = await self.answer(request)
+            await send(response)
+
+        while True:
+            try:
+                line = await self.read_request(reader)
+            except asyncio.LimitOverrunError:
+                await send({"id": None, "error": "Bad request: longer than {} bytes".format(self.MAX_REQUEST_BYTES)})
+                continue
+            except ConnectionError:
+                break
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.wait(tasks)
+        writer.close()
+
+    async def run(self):
+        """
+        Serve until interrupted, then print the latency percentiles to stderr.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.args.socket)), exist_ok=True)
+        remove_socket(self.args.socket)
+
+        # start the workers (a task per worker) and load the levels before the first request.
+        start_time = perf_counter()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(
+            self.executor, warm_up, list(self.levels.values()), self.args.precompute, self.args.cache_dir)
+            for _ in range(self.args.jobs)))
+        print("worker pool started in {:.2f} ms".format((perf_counter() - start_time) * 1000), file=sys.stderr)
+
+        server = await asyncio.start_unix_server(self.handle, path=self.args.socket, limit=self.MAX_REQUEST_BYTES)
+
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+
+        print("serving {} levels on {}".format(len(self.levels), self.args.socket), file=sys.stderr)
+        async with server:
+            await stop.wait()
+
+        remove_socket(self.args.socket)
+        self.executor.shutdown()
+        print("latency (ms): {}".format(json.dumps(percentiles(self.latencies))), file=sys.stderr)
+
+
+def remove_socket(path: str):
+    """
+    Remove the socket file left by an earlier server.
+    :param path: Socket path.
+    :return: Raise ValueError if the path is not a socket, it is left untouched.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError("'{}' exists and is not a socket".format(path))
+    os.remove(path)
+
+
+def client(socket_path: str, lines: List[str]) -> List[Tuple[dict, float]]:
+    """
+    Stub client, sends all the requests on one connection and waits for the responses.
+    :param socket_path: Server socket path.
+    :param lines: JSON requests, one per line.
+    :return: List of (response, round trip time in ms), in the order the responses came.
+    """
+    lines = [line.strip() for line in lines if line.strip()]
+    responses = list()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        start_time = perf_counter()
+        sock.sendall("".join(line + "\n" for line in lines).encode())
+        sock.shutdown(socket.SHUT_WR)
+
+        with sock.makefile('rb') as file:
+            for line in file:
+                responses.append((json.loads(line), (perf_counter() - start_time) * 1000))
+    return responses
+
+
+def main(argv: List[str] = None):
+    """
+    Run the server, or the stub client.
+    :param argv: Command line arguments, defaults to sys.argv.
+    """
+    args = parser.parse_args(argv)
+    if args.client:
+        for response, round_trip in client(args.socket, sys.stdin.readlines()):
+            print(json.dumps(dict(response, round_trip=round_trip)), flush=True)
+        return
+
+    try:
+        remove_socket(args.socket)
+    except ValueError as e:
+        parser.error("--socket: {}".format(e))
+    asyncio.run(Server(args).run())
+
+
+parser = argparse.ArgumentParser(prog='bloxorz.py serve', description='Bloxorz solver server.')
+parser.add_argument('--cache-dir', default=os.path.join(os.path.expanduser('~'), '.cache', 'bloxorz'),
+                    help='Directory of the exact heuristic cost tables. (default=~/.cache/bloxorz)')
+parser.add_argument('--client', action='store_true',
+                    help='Stub client, send the JSON requests read from stdin and print the responses.')
+parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                    help='Number of worker processes. (default=number of CPUs)')
+parser.add_argument('-l', '--levels', default='levels',
+                    help='Directory of the level files, requests name the levels by file name without extension. '
+                         '(default=levels)')
+parser.add_argument('-p', '--precompute', action='store_true',
+                    help='Precompute the state transition table of each level and order.')
+parser.add_argument('--socket', default=os.path.join(os.path.expanduser('~'), '.cache', 'bloxorz', 'bloxorz.sock'),
+                    help='Unix domain socket path. (default=~/.cache/bloxorz/bloxorz.sock)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
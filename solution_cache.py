@@ -0,0 +1,162 @@
+import json
+import os
+from collections import OrderedDict
+from pos import Pos
+
+# format of the cache entries, entries stored with another version are dropped on lookup.
+VERSION = 1
+
+# fraction of the size limit the on-disk tier is brought down to when it grows over the limit, so that
+# the directory is scanned once every many puts rather than on every put.
+EVICT_TO = 0.9
+
+
+class SolutionCache:
+    """
+    Cache of search results, keyed by the world map, the start and target positions and the search configuration.
+    Results are kept in an in-memory LRU tier and in an on-disk tier of one JSON file per result. Disk entries are
+    touched on every hit, and the least recently used ones are removed when the tier grows over its size limit.
+    """
+
+    def __init__(self, cache_dir: str, memory_entries: int = 1024, disk_bytes: int = 64 * 1024 * 1024):
+        """
+        :param cache_dir: Directory of the on-disk tier.
+        :param memory_entries: Maximum number of results kept in memory.
+        :param disk_bytes: Maximum total size of the on-disk tier.
+        """
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self.memory = OrderedDict()
+
+        # total size of the on-disk tier, counted by the first eviction and kept up to date by put. Entries removed
+        # by other processes are only seen by the next eviction, the total errs on the high side.
+        self.disk_total = None
+
+    def key(self, blox, start: Pos, target_pos: Pos) -> str:
+        """
+        Hash of a world map, the start and target positions and the search configuration.
+        :param blox: Bloxorz object providing the world map and the search arguments.
+        :param start: Start position of the brick.
+        :param target_pos: Target position of the brick.
+        :return: hex digest string.
+        """
+        import hashlib
+        args = blox.args
+        digest = hashlib.sha256()
+        digest.update("{}x{}:{}:{}:{}:{}:{}:{}:{}:{}:{}:{}:{}:{}:{}".format(
+            blox.width, blox.height, blox.pack_state(start), blox.pack_state(target_pos), args.search, args.order,
+            args.cost_method, args.open_list, args.depth_limit, args.beam_width, args.tt_size, args.weight,
+            args.node_budget, args.time_budget, VERSION).encode())
+        digest.update(blox.grid)
+        digest.update(blox.level.mechanics_bytes())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        """
+        :return: file path of the on-disk entry of a key.
+        """
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key: str) -> dict:
+        """
+        Look up a result, in memory first, then on disk.
+        :param key: Cache key.
+        :return: Result dictionary (see SearchResult.to_dict), None if not cached.
+        """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        path = self.path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            entry = None
+
+        if not isinstance(entry, dict) or entry.get("version") != VERSION or entry.get("result") is None:
+            # stale or partial entry.
+            self.remove(path)
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by another process since it was read, the result is still good.
+            pass
+        self.remember(key, entry["result"])
+        return entry["result"]
+
+    def put(self, key: str, result: dict):
+        """
+        Store a result in both tiers.
+        :param key: Cache key.
+        :param result: Result dictionary (see SearchResult.to_dict).
+        """
+        self.remember(key, result)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        # write to a temporary file first, so concurrent runs never see a partial entry.
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w") as file:
+            json.dump({"version": VERSION, "result": result}, file)
+            size = file.tell()
+        os.replace(tmp_path, path)
+
+        # the directory is only scanned when the tier may have grown over its size limit.
+        if self.disk_total is not None:
+            self.disk_total += size - old_size
+        if self.disk_total is None or self.disk_total > self.disk_bytes:
+            self.evict()
+
+    def remember(self, key: str, result: dict):
+        """
+        Add a result to the in-memory tier, dropping the least recently used one if the tier is full.
+        """
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        """
+        Remove the least recently used on-disk entries until the tier fits in EVICT_TO of its size limit.
+        """
+        entries = list()
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.disk_bytes:
+            self.disk_total = total
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.disk_bytes * EVICT_TO:
+                break
+            self.remove(path)
+            total -= size
+        self.disk_total = total
+
+    @staticmethod
+    def remove(path: str):
+        """
+        Remove an on-disk entry, if another process did not already.
+        """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,94 @@
+import sys
+
+
+class SearchStats:
+    """
+    Counters and phase timers shared by all the search algorithms.
+    Counters are plain integer attributes, incremented in place by the searches. Phase timers are only
+    read around the heuristic setup and the world map display, so keeping the stats costs next to nothing.
+    """
+
+    def __init__(self):
+        # nodes taken from the frontier and nodes added to the search tree(s), the root nodes excluded.
+        self.expanded = 0
+        self.generated = 0
+
+        # states added to the frontier again, for a cheaper path than the one they were added with.
+        self.reopened = 0
+
+        # moves dropped for leaving the world map (only counted without a transition table,
+        # which holds the valid moves only) and for reaching a visited state.
+        self.rejected_off_map = 0
+        self.rejected_visited = 0
+
+        # largest number of nodes waiting for expansion at once.
+        self.max_frontier = 0
+
+        # heuristic cost lookups.
+        self.heuristic_evals = 0
+
+        # seconds spent preparing the heuristic costs, searching and displaying the search steps.
+        self.setup_time = 0.0
+        self.search_time = 0.0
+        self.render_time = 0.0
+
+    def frontier(self, size: int):
+        """
+        Record the current frontier size.
+        :param size: Number of nodes waiting for expansion.
+        """
+        if size > self.max_frontier:
+            self.max_frontier = size
+
+    def to_dict(self) -> dict:
+        """
+        :return: Stats as a dictionary of plain values.
+        """
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        """
+        :param values: Stats dictionary created with to_dict.
+        :return: SearchStats object.
+        """
+        stats = cls()
+        for name, value in values.items():
+            setattr(stats, name, value)
+        return stats
+
+
+def run_profiled(method: str, func, *args):
+    """
+    Call a function under cProfile or tracemalloc and print the report to stderr.
+    :param method: 'cprofile' for the functions taking the most time,
+        'tracemalloc' for the source lines allocating the most memory.
+    :param func: Function to call.
+    :param args: Function arguments.
+    :return: Return value of the function.
+    """
+    # the profilers are imported here, they are only needed with --profile and take longer to import
+    # than the rest of the program.
+    if method == 'cprofile':
+        import cProfile
+        import io
+        import pstats
+
+        profiler = cProfile.Profile()
+        value = profiler.runcall(func, *args)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('tottime').print_stats(20)
+        print(report.getvalue(), file=sys.stderr)
+        return value
+
+    import tracemalloc
+    tracemalloc.start()
+    value = func(*args)
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("peak memory: {} bytes".format(peak), file=sys.stderr)
+    for line_stats in snapshot.statistics('lineno')[:20]:
+        print(line_stats, file=sys.stderr)
+    return value
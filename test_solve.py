@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests of the bloxorz.solve library entry point.
+
+    $ python3 -m unittest test_solve
+"""
+import unittest
+
+from bloxorz import solve
+from direction import Direction
+
+# first level, as a matrix of tile values.
+LEVEL_1 = [
+    [1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
+    [1, 1, 1, 1, 1, 1, 0, 0, 0, 0],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+    [0, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [0, 0, 0, 0, 0, 1, 1, 9, 1, 1],
+    [0, 0, 0, 0, 0, 0, 1, 1, 1, 0]
+]
+
+
+class SolveTest(unittest.TestCase):
+
+    def test_matrix(self):
+        result = solve(LEVEL_1, (1, 1))
+        self.assertEqual(result.cost, 7)
+        self.assertEqual(result.path, [Direction.RIGHT, Direction.RIGHT, Direction.DOWN, Direction.RIGHT,
+                                       Direction.RIGHT, Direction.RIGHT, Direction.DOWN])
+
+    def test_mechanics_tiles(self):
+        # bridges and switches are only defined by level files.
+        for value in (2, 3, 4):
+            with self.assertRaises(ValueError):
+                solve([[1, value, 1], [1, 1, 9]], (0, 0))
+
+    def test_unknown_tiles(self):
+        for value in (5, 7, 255, '1', None):
+            with self.assertRaises(ValueError):
+                solve([[1, value, 1], [1, 1, 9]], (0, 0))
+
+    def test_bad_matrix(self):
+        for matrix in ([], [[]], [[1, 1], [1, 1, 9]], [[1, 1, 1], [1, 1, 1]]):
+            with self.assertRaises(ValueError):
+                solve(matrix, (0, 0))
+
+    def test_bad_positions(self):
+        with self.assertRaises(ValueError):
+            solve(LEVEL_1, None)
+        with self.assertRaises(ValueError):
+            solve(LEVEL_1, (9, 0))
+        with self.assertRaises(ValueError):
+            solve(LEVEL_1, (1, 1), target=(0, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+from array import array
+from brick import Brick
+from direction import Direction
+from orientation import Orientation
+
+
+class TransitionTable:
+    """
+    Successor table of all the brick positions on a world map, built once per level.
+    The table is stored in compressed sparse row form: the successors of a tile state (x, y, orientation) are
+    targets[offsets[tile_state]:offsets[tile_state + 1]], reached by the moves in the same slice of directions.
+    Successors are stored in the search order, so iterating over a slice honours --order.
+
+    On levels with switches and bridges, the table is shared by all the bridge masks: each move also holds the
+    bridges it needs open (required) and the switch effect of landing (set, clear and toggle masks), so the
+    successors of a state are found by masking, without deriving the moves again.
+    """
+
+    def __init__(self, blox, order: str):
+        """
+        Enumerate all legal tile states of the world map and their successors.
+        :param blox: Bloxorz object providing the world map and the state packing.
+        :param order: Order of search directions, a permutation of the characters 'L', 'R', 'U', 'D'.
+        """
+        self.order = order
+        self.num_states = blox.num_tile_states
+        self.offsets = array('l', [0])
+        self.targets = array('q')
+        self.directions = array('b')
+
+        # only filled for levels with switches and bridges.
+        self.static = blox.level.is_static()
+        self.required = array('q')
+        self.sets = array('q')
+        self.clears = array('q')
+        self.toggles = array('q')
+
+        # Direction enumerations indexed by their values, avoids Enum lookups while iterating.
+        self.by_value = [None] + [Direction(value) for value in range(1, len(Direction) + 1)]
+
+        # positions are checked with all the bridges open, the bridges needed are checked per mask.
+        directions = Direction.get_directions(order)
+        for state in range(self.num_states):
+            pos = blox.unpack_state(state)
+            if not blox.is_off_map(pos):
+                brick = Brick(pos)
+                for direction in directions:
+                    next_pos = brick.next_pos(direction)
+                    if not blox.is_off_map(next_pos):
+                        self.targets.append(blox.pack_state(next_pos, 0))
+                        self.directions.append(direction.value)
+                        if not self.static:
+                            blocks = Brick(next_pos).get_blocks_occupied()
+                            set_mask, clear_mask, toggle_mask = blox.level.switch_effect(
+                                blocks, next_pos.orientation is Orientation.STANDING)
+                            self.required.append(blox.level.bridge_bits(blocks))
+                            self.sets.append(set_mask)
+                            self.clears.append(clear_mask)
+                            self.toggles.append(toggle_mask)
+            self.offsets.append(len(self.targets))
+
+    def __len__(self) -> int:
+        """
+        :return: Number of moves (edges) in the table.
+        """
+        return len(self.targets)
+
+    def successors(self, state: int):
+        """
+        Legal moves from the given state.
+        :param state: packed state id.
+        :return: generator of (next state id, direction) tuples.
+        """
+        by_value = self.by_value
+        if self.static:
+            for i in range(self.offsets[state], self.offsets[state + 1]):
+                yield self.targets[i], by_value[self.directions[i]]
+            return
+
+        mask, tile_state = divmod(state, self.num_states)
+        for i in range(self.offsets[tile_state], self.offsets[tile_state + 1]):
+            required = self.required[i]
+            if mask & required != required:
+                continue
+            next_mask = ((mask | self.sets[i]) & ~self.clears[i]) ^ self.toggles[i]
+            if next_mask & required != required:
+                continue
+            yield next_mask * self.num_states + self.targets[i], by_value[self.directions[i]]